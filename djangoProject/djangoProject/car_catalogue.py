@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from djangoProject.models import CacheVersion, GetCarModel
+
+# The catalogue last loaded by this process, the version it was loaded at and
+# when that version was last checked against the database
+_cars = {}
+_version = None
+_checked = 0
+
+
+def car_catalogue():
+    # Returns a dict of every car model, sorted by name, to a dict of its
+    # Car_Model and Battery_Capacity. The catalogue is kept in this process,
+    # which checks its version in the database at most once every
+    # CAR_CATALOGUE_VERSION_SECONDS, so most lookups make no query at all
+    global _cars, _version, _checked
+
+    now = time.monotonic()
+    if _version is not None and \
+            now - _checked < settings.CAR_CATALOGUE_VERSION_SECONDS:
+        return _cars
+
+    version = CacheVersion.objects.filter(Name='cardata').values_list(
+        'Version', flat=True).first() or 0
+    if version != _version:
+        cars = GetCarModel.objects.order_by('Car_Model').values(
+            'Car_Model', 'Battery_Capacity')
+        _cars = {car['Car_Model']: car for car in cars}
+        _version = version
+    _checked = now
+
+    return _cars
+
+
+@receiver([post_save, post_delete], sender=GetCarModel)
+def invalidate_car_catalogue(sender, **kwargs):
+    # Other processes load the new catalogue on their next version check
+    global _version
+
+    CacheVersion.objects.get_or_create(Name='cardata')
+    CacheVersion.objects.filter(Name='cardata').update(
+        Version=F('Version') + 1)
+    _version = None
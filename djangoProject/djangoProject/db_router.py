@@ -0,0 +1,89 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+PIN_KEY = 'primary_until'
+
+# Whether the current request reads from the replica
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+    # Sends the reads of views wrapped in read_from_replica to the replica.
+    # Every other read, every write and the migrations stay on the primary,
+    # as does the scheduler worker, which does not use Django
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return settings.REPLICA_DATABASE
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def async_read(func):
+    # Wraps a function making autocommit reads for an async view. Django 3.2
+    # runs every sync view and default sync_to_async call of a process on one
+    # shared thread, so these run on the executor's threads instead. Each of
+    # those threads keeps its own connection, which is replaced here once it
+    # is older than CONN_MAX_AGE or broken
+    def read(*args, **kwargs):
+        close_old_connections()
+        return func(*args, **kwargs)
+
+    return sync_to_async(read, thread_sensitive=False)
+
+
+def pin_to_primary(request):
+    # Keeps the user's reads on the primary for REPLICA_PIN_SECONDS, so that
+    # they see a change they just made even if the replica is behind
+    request.session[PIN_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+
+
+def pinned_to_primary(request):
+    return request.session.get(PIN_KEY, 0) > time.time()
+
+
+def read_from_replica(view):
+    # Runs a read-only view with its reads on the replica, unless the user
+    # was pinned to the primary by a recent change. Async views keep the
+    # setting in the queries they hand to async_read, which copies the context
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if await async_read(pinned_to_primary)(request):
+                return await view(request, *args, **kwargs)
+
+            token = _replica_reads.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if pinned_to_primary(request):
+            return view(request, *args, **kwargs)
+
+        token = _replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return wrapper
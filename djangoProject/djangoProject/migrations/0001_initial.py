@@ -0,0 +1,76 @@
+# Generated by Django 3.2.25 on 2026-10-18 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GetCarModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Car_Model', models.CharField(max_length=100)),
+                ('Battery_Capacity', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'cardata',
+            },
+        ),
+        migrations.CreateModel(
+            name='ManagerDatabase',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('Username', models.CharField(max_length=45)),
+            ],
+            options={
+                'db_table': 'managerdata',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserDatabase',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('Username', models.CharField(max_length=45)),
+                ('Car', models.CharField(max_length=100, verbose_name='User Vehicle')),
+                ('Current_Charge', models.IntegerField(verbose_name='Current Vehicle Charge')),
+                ('Preferred_Charge_Station', models.IntegerField(verbose_name='Charging Station')),
+                ('Preferred_Start_Datetime', models.DateTimeField(verbose_name='Preferred Start Datetime')),
+                ('Preferred_End_Datetime', models.DateTimeField(verbose_name='Preferred End Datetime')),
+                ('Preferred_Charge_Level', models.IntegerField(verbose_name='Preferred Charging Level')),
+                ('Scheduled_Datetime_Start', models.DateTimeField(verbose_name='Allocated Charging Start Datetime')),
+                ('Scheduled_Datetime_End', models.DateTimeField(verbose_name='Allocated Charging End Datetime')),
+                ('Charging_Station', models.IntegerField(verbose_name='Allocated Charging Station')),
+                ('Final_Charge', models.IntegerField(verbose_name='Max Charge During Slot')),
+                ('Is_Scheduling', models.BooleanField()),
+                ('Arrival', models.DateTimeField(verbose_name='Arrival Datetime')),
+                ('Slot_Taken', models.BooleanField()),
+                ('New_Sugg_Start', models.DateTimeField()),
+                ('New_Sugg_End', models.DateTimeField()),
+                ('Error', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'userdata',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserTimes',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idEV', models.IntegerField()),
+                ('chargeInSlot', models.FloatField()),
+                ('Timeslots', models.DateTimeField()),
+                ('ArrivalTime', models.DateTimeField()),
+                ('EndTime', models.DateTimeField()),
+                ('chargerID', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'userTimes',
+            },
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 3.2.25 on 2026-10-18 23:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clear_unknown_cars(apps, schema_editor):
+    # userdata.Car was free text, so it can name a car model missing from
+    # cardata, which the foreign key would reject
+    UserDatabase = apps.get_model('djangoProject', 'UserDatabase')
+    GetCarModel = apps.get_model('djangoProject', 'GetCarModel')
+    UserDatabase.objects.exclude(
+        Car__in=GetCarModel.objects.values('Car_Model')).update(Car=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('Name', models.CharField(max_length=45, primary_key=True, serialize=False)),
+                ('Version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'cacheversions',
+            },
+        ),
+        migrations.CreateModel(
+            name='FleetJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Owner', models.CharField(max_length=45)),
+                ('Created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'fleetjobs',
+            },
+        ),
+        migrations.CreateModel(
+            name='SlotForecast',
+            fields=[
+                ('Timeslot', models.DateTimeField(primary_key=True, serialize=False)),
+                ('Traditional_Production', models.FloatField()),
+                ('Consumption', models.FloatField()),
+                ('Renewable_Production', models.FloatField()),
+                ('Max_Capacity', models.FloatField()),
+            ],
+            options={
+                'db_table': 'slotforecast',
+            },
+        ),
+        migrations.CreateModel(
+            name='StationVersion',
+            fields=[
+                ('Station', models.IntegerField(primary_key=True, serialize=False)),
+                ('Version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'stationversions',
+            },
+        ),
+        migrations.AddField(
+            model_name='userdatabase',
+            name='Lease_Expires',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userdatabase',
+            name='Lease_Owner',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='getcarmodel',
+            name='Car_Model',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='userdatabase',
+            name='Car',
+            field=models.CharField(max_length=100, null=True, verbose_name='User Vehicle'),
+        ),
+        migrations.RunPython(clear_unknown_cars, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userdatabase',
+            name='Car',
+            field=models.ForeignKey(db_column='Car', null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject.getcarmodel', to_field='Car_Model', verbose_name='User Vehicle'),
+        ),
+        migrations.AddField(
+            model_name='userdatabase',
+            name='Fleet_Job',
+            field=models.ForeignKey(blank=True, db_column='Fleet_Job', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='vehicles', to='djangoProject.fleetjob'),
+        ),
+    ]
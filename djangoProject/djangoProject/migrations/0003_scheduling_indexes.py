@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject', '0002_scheduler_worker_tables'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userdatabase',
+            name='Username',
+            field=models.CharField(db_index=True, max_length=45),
+        ),
+        migrations.AddIndex(
+            model_name='userdatabase',
+            index=models.Index(fields=['Is_Scheduling', 'Arrival'], name='userdata_scheduling_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userdatabase',
+            index=models.Index(fields=['Charging_Station', 'Scheduled_Datetime_Start', 'Scheduled_Datetime_End'], name='userdata_station_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertimes',
+            index=models.Index(fields=['Timeslots', 'idEV'], name='usertimes_slot_ev_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertimes',
+            index=models.Index(fields=['idEV', 'Timeslots'], name='usertimes_ev_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-18 23:38
+
+from django.db import migrations, models
+
+
+def add_usertimes_id(apps, schema_editor):
+    # The MySQL databases that existed before the migrations, on which 0001
+    # was faked with migrate --fake-initial (see README.md), have a userTimes table without the id column 0001 creates
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        columns = [column.name for column in
+                   connection.introspection.get_table_description(
+                       cursor, 'userTimes')]
+    if 'id' not in columns:
+        schema_editor.execute(
+            "ALTER TABLE userTimes ADD COLUMN id integer AUTO_INCREMENT "
+            "NOT NULL PRIMARY KEY FIRST")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject', '0003_scheduling_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='managerdatabase',
+            name='id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='userdatabase',
+            name='id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.RunPython(add_usertimes_id, migrations.RunPython.noop),
+    ]
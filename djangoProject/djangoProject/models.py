@@ -5,16 +5,33 @@ from django.db import models
 
 
 class GetCarModel(models.Model):
-    Car_Model = models.CharField(max_length=100)
+    Car_Model = models.CharField(max_length=100, unique=True)
+    Battery_Capacity = models.IntegerField()
 
     class Meta:
         db_table = "cardata"
 
 
+class FleetJob(models.Model):
+    # A batch of vehicles submitted together through the fleet API, which the
+    # scheduler worker schedules in one solve
+    Owner = models.CharField(max_length=45)
+    Created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "fleetjobs"
+
+
 class UserDatabase(models.Model):
-    id = models.IntegerField(primary_key=True)
-    Username = models.CharField(max_length=45)
-    Car = models.CharField(max_length=100, verbose_name="User Vehicle")
+    id = models.AutoField(primary_key=True)
+    Username = models.CharField(max_length=45, db_index=True)
+    # Stores the Car_Model, so existing rows and the scheduler worker's join
+    # on cardata keep working. Rows whose car model was missing from cardata
+    # were left without a car by migration 0002, and fail to be scheduled
+    # until the user picks one
+    Car = models.ForeignKey(GetCarModel, to_field="Car_Model", db_column="Car",
+                            null=True, on_delete=models.PROTECT,
+                            verbose_name="User Vehicle")
     Current_Charge = models.IntegerField(verbose_name="Current Vehicle Charge")
     Preferred_Charge_Station = models.IntegerField(
         verbose_name="Charging Station")
@@ -37,27 +54,98 @@ class UserDatabase(models.Model):
     New_Sugg_Start = models.DateTimeField()
     New_Sugg_End = models.DateTimeField()
     Error = models.IntegerField()
+    # Set by the scheduler worker that is scheduling the booking
+    Lease_Owner = models.CharField(max_length=64, null=True, blank=True)
+    Lease_Expires = models.DateTimeField(null=True, blank=True)
+    Fleet_Job = models.ForeignKey(FleetJob, null=True, blank=True,
+                                  on_delete=models.CASCADE,
+                                  db_column="Fleet_Job",
+                                  related_name="vehicles")
 
     class Meta:
         db_table = "userdata"
+        indexes = [
+            # Claiming the bookings waiting to be scheduled, oldest first
+            models.Index(fields=["Is_Scheduling", "Arrival"],
+                         name="userdata_scheduling_idx"),
+            # Clash checks and loading the bookings of a station
+            models.Index(fields=["Charging_Station",
+                                 "Scheduled_Datetime_Start",
+                                 "Scheduled_Datetime_End"],
+                         name="userdata_station_period_idx"),
+        ]
 
 
 class UserTable(tables.Table):
     class Meta:
         model = UserDatabase
         attrs = {'width': '100%'}
-        exclude = (
-            "Is_Scheduling", "id", "Charging_Station", "Car", "Slot_Taken",
-            "New_Sugg_Start", "New_Sugg_End", "Error")
-        sequence = ("Username", "Current_Charge", "Preferred_Charge_Level",
-                    "Preferred_Start_Datetime", "Preferred_End_Datetime",
-                    "Preferred_Charge_Station",
-                    "Scheduled_Datetime_Start", "Scheduled_Datetime_End",
-                    "Final_Charge")
+        # Also the only columns loaded for the table (see manager_home)
+        fields = ("Username", "Current_Charge", "Preferred_Charge_Level",
+                  "Preferred_Start_Datetime", "Preferred_End_Datetime",
+                  "Preferred_Charge_Station",
+                  "Scheduled_Datetime_Start", "Scheduled_Datetime_End",
+                  "Final_Charge")
+        sequence = fields
+        order_by = "-Scheduled_Datetime_Start"
+
+
+class StationVersion(models.Model):
+    # Changed whenever a booking of the station is written or freed, so the
+    # scheduler worker knows when to reload its bookings
+    Station = models.IntegerField(primary_key=True)
+    Version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "stationversions"
+
+
+class SlotForecast(models.Model):
+    # Written by the scheduler worker whenever it loads a new forecast
+    Timeslot = models.DateTimeField(primary_key=True)
+    Traditional_Production = models.FloatField()
+    Consumption = models.FloatField()
+    Renewable_Production = models.FloatField()
+    Max_Capacity = models.FloatField()
+
+    class Meta:
+        db_table = "slotforecast"
+
+
+class CacheVersion(models.Model):
+    # Changed whenever the data cached under Name changes
+    Name = models.CharField(max_length=45, primary_key=True)
+    Version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "cacheversions"
+
+
+class UserTimes(models.Model):
+    # Charge scheduled for a vehicle in each time slot, written by the
+    # scheduler worker. The id column is added to existing databases by
+    # migration 0004, as Django needs a primary key
+    idEV = models.IntegerField()
+    chargeInSlot = models.FloatField()
+    Timeslots = models.DateTimeField()
+    ArrivalTime = models.DateTimeField()
+    EndTime = models.DateTimeField()
+    chargerID = models.IntegerField()
+
+    class Meta:
+        db_table = "userTimes"
+        indexes = [
+            # Time slot ranges, as read by the worker and utilisation report
+            models.Index(fields=["Timeslots", "idEV"],
+                         name="usertimes_slot_ev_idx"),
+            # Replacing the schedule of a vehicle
+            models.Index(fields=["idEV", "Timeslots"],
+                         name="usertimes_ev_slot_idx"),
+        ]
 
 
 class ManagerDatabase(models.Model):
-    id = models.IntegerField(primary_key=True)
+    id = models.AutoField(primary_key=True)
     Username = models.CharField(max_length=45)
 
     class Meta:
@@ -83,12 +83,46 @@ DATABASES = {
         'PASSWORD': 'password',
         'HOST': 'schedulerdb.cv1vtvg9bql2.eu-west-2.rds.amazonaws.com',
         'PORT': '3306',
+        # Keep connections open between requests instead of reconnecting for every request
+        'CONN_MAX_AGE': 60,
         'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            'init_command': "SET sql_mode='STRICT_TRANS_TABLES', SESSION MAX_EXECUTION_TIME=30000",
+            'connect_timeout': 10,
         },
     }
 }
 
+# Read replica of the database for the dashboard and history pages (see
+# djangoProject/db_router.py). Without REPLICA_DB_HOST the replica alias uses
+# a second connection to the primary. Tests read the primary through it.
+
+DATABASES['replica'] = dict(
+    DATABASES['default'],
+    HOST=os.environ.get('REPLICA_DB_HOST', DATABASES['default']['HOST']),
+    TEST={'MIRROR': 'default'},
+)
+
+# Two local SQLite databases instead, to try the routing without MySQL.
+# Copy primary.sqlite3 to replica.sqlite3 after migrating to "replicate" it
+
+if os.environ.get('LOCAL_DATABASES'):
+    DATABASES = {
+        alias: {'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': BASE_DIR / f"{alias}.sqlite3".replace(
+                    'default', 'primary'),
+                'TEST': DATABASES[alias].get('TEST', {})}
+        for alias in ('default', 'replica')
+    }
+
+DATABASE_ROUTERS = ['djangoProject.db_router.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+
+# After a user changes their booking, their reads stay on the primary for
+# this long so that they see their change before it reaches the replica
+# (seconds)
+
+REPLICA_PIN_SECONDS = 30
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -130,6 +164,47 @@ if DEBUG is True:
 else:
     STATIC_ROOT = 'static'
 
+# Scheduler worker wake up address (UDP). The worker also checks for new
+# bookings on its own, so a lost message only delays scheduling. The worker
+# reads the same environment variables (see scheduler/job_queue.py)
+
+SCHEDULER_WAKE_ADDRESS = (
+    os.environ.get('SCHEDULER_WAKE_HOST', '127.0.0.1'),
+    int(os.environ.get('SCHEDULER_WAKE_PORT', 50917)),
+)
+
+# Longest time a booking status request waits for the scheduler before
+# answering, and the time between its checks of the booking (seconds)
+
+BOOKING_STATUS_WAIT = 10
+BOOKING_STATUS_INTERVAL = 0.5
+
+# Fleet booking API. The scheduler worker claims at most MAX_FLEET_SIZE
+# vehicles of a fleet job at once (see scheduler/run_lp_scheduler.py)
+
+CHARGING_STATIONS = (1, 2)
+FLEET_MAX_VEHICLES = 250
+
+# Rows on each page of the manager dashboard's station tables
+
+MANAGER_TABLE_PER_PAGE = 25
+
+# Station utilisation report. Cached reports are keyed on the versions of the
+# schedules and forecast, so the timeout only frees memory
+
+UTILISATION_MAX_DAYS = 31
+UTILISATION_CACHE_SECONDS = 60 * 60
+
+# Manager station tables and user schedules, cached until the version of a
+# station's schedules changes. The timeout only frees memory
+
+SCHEDULE_CACHE_SECONDS = 60 * 60
+
+# Longest time a process keeps using the car catalogue after it was changed
+# by another process or outside of Django
+
+CAR_CATALOGUE_VERSION_SECONDS = 60
+
 # SMTP Configuration
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
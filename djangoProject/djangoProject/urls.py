@@ -14,6 +14,13 @@ urlpatterns = [
     path('managerHome', views.manager_home, name='managerHome'),
     path('userHome', views.user_home, name='userHome'),
     path('userScheduled', views.user_scheduled, name='userScheduled'),
+    path('bookingStatus/<int:booking_id>', views.booking_status,
+         name='bookingStatus'),
+    path('api/fleetBookings', views.fleet_bookings, name='fleetBookings'),
+    path('api/fleetBookings/<int:job_id>', views.fleet_booking_status,
+         name='fleetBookingStatus'),
+    path('api/utilisation', views.station_utilisation,
+         name='stationUtilisation'),
     path('changeCarModel', views.change_car_model, name='changeCarModel'),
 
     path('reset_password/', auth_views.PasswordResetView.as_view(
@@ -1,14 +1,43 @@
+import asyncio
+import base64
+import binascii
+import json
+import socket
+import time
 from datetime import datetime, timedelta
+from functools import partial
+from urllib.parse import urlencode
 
+from asgiref.sync import sync_to_async
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
+from django.core.cache import cache
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.http import HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import render, redirect
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django_tables2 import RequestConfig
 
+from djangoProject.car_catalogue import car_catalogue
+from djangoProject.db_router import async_read, pin_to_primary, \
+    read_from_replica
 from djangoProject.forms import CreateUserForm
-from djangoProject.models import GetCarModel, UserDatabase, ManagerDatabase, \
-    UserTable
+from djangoProject.models import UserDatabase, ManagerDatabase, UserTable, \
+    StationVersion, FleetJob, CacheVersion, UserTimes
+
+# The columns of a user's booking each page needs, so that a request loads the
+# user's row once and only with these fields
+USER_HOME_FIELDS = ('id', 'Charging_Station', 'Final_Charge',
+                    'Scheduled_Datetime_Start', 'Scheduled_Datetime_End')
+USER_SCHEDULED_FIELDS = USER_HOME_FIELDS + ('Current_Charge',
+                                            'Preferred_Charge_Level')
+BOOKING_STATUS_FIELDS = ('Is_Scheduling', 'Error', 'Slot_Taken',
+                         'New_Sugg_Start', 'New_Sugg_End')
 
 
 def time_to_minutes(s):
@@ -29,17 +58,109 @@ def discretise_time(t):
         return t + 15 - rem
 
 
+def notify_scheduler():
+    # Wakes the scheduler worker so that a new booking is picked up straight
+    # away rather than on the worker's next periodic check
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b"schedule", settings.SCHEDULER_WAKE_ADDRESS)
+    except OSError:
+        pass
+
+
+def bump_station_versions(stations):
+    # Moves the stations' schedules on to a new version, as the worker does
+    # when it writes them, so that cached tables and reports are replaced
+    for station in set(stations):
+        versions = StationVersion.objects.filter(Station=station)
+        if versions.update(Version=F('Version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                StationVersion.objects.create(Station=station, Version=1)
+        except IntegrityError:
+            # Another request created the row first
+            versions.update(Version=F('Version') + 1)
+
+
+def station_versions():
+    # The version of every station's schedules, for keying cached pages on
+    return '-'.join(
+        f"{station}.{version}" for station, version in
+        StationVersion.objects.order_by('Station').values_list(
+            'Station', 'Version'))
+
+
+def booking_result(booking):
+    # The status of a booking the scheduler has finished with, from a dict of
+    # its BOOKING_STATUS_FIELDS
+    if booking['Error'] == 1:
+        return 'failed'
+    if booking['Slot_Taken']:
+        return 'suggested'
+    return 'scheduled'
+
+
+def report_booking_result(request, bookingId, booking):
+    # Turns the scheduler's result for a booking, a dict of its
+    # BOOKING_STATUS_FIELDS, into messages for the user and clears it, then
+    # returns the booking's status
+    result = booking_result(booking)
+    if result == 'failed':
+        messages.error(request,
+                       "Unfortunately the scheduler wasn't able to generate a valid time for you, due to energy consumption being too high at the given time.")
+        messages.error(request,
+                       "Please enter a different preferred time and try again.")
+        UserDatabase.objects.filter(id=bookingId).update(Error=0)
+
+    elif result == 'suggested':
+        suggestedStart = str(booking['New_Sugg_Start'])
+        suggestedStart = suggestedStart[:19]
+        suggestedStart = datetime.strptime(suggestedStart,
+                                           '%Y-%m-%d %H:%M:%S')
+        suggestedEnd = str(booking['New_Sugg_End'])
+        suggestedEnd = suggestedEnd[:19]
+        suggestedEnd = datetime.strptime(suggestedEnd,
+                                         '%Y-%m-%d %H:%M:%S')
+        string1 = f"Suggested start time: {suggestedStart}"
+        string2 = f"Suggested end time: {suggestedEnd}"
+        messages.error(request,
+                       "Please enter a different preferred time as your suggested time has already been taken.")
+        messages.error(request, string1)
+        messages.error(request, string2)
+        UserDatabase.objects.filter(id=bookingId).update(Slot_Taken=False)
+
+    return result
+
+
+def user_role(request):
+    # The role is stored in the session at login, so that pages do not look
+    # the user up in managerdata and userdata on every visit. Sessions from
+    # before roles were stored get theirs on their first visit
+    if not request.user.is_authenticated:
+        return None
+    role = request.session.get('role')
+    if role is None:
+        current_user = request.user.username
+        if ManagerDatabase.objects.filter(Username=current_user).exists():
+            role = 'manager'
+        elif UserDatabase.objects.filter(Username=current_user).exists():
+            role = 'user'
+        else:
+            return None
+        request.session['role'] = role
+    return role
+
+
 def home(request):
     return render(request, 'home.html')
 
 
 def login_page(request):
-    current_user = request.user.username
-    if request.user.is_authenticated and ManagerDatabase.objects.filter(
-            Username=current_user).exists():
+    role = user_role(request)
+    if role == 'manager':
         return redirect('managerHome')
-    elif request.user.is_authenticated and UserDatabase.objects.filter(
-            Username=current_user).exists():
+    elif role == 'user':
         return redirect('userHome')
     else:
         if request.method == 'POST':
@@ -51,10 +172,12 @@ def login_page(request):
             if user is not None and ManagerDatabase.objects.filter(
                     Username=username).exists() and 'managerSubmit' in request.POST:
                 login(request, user)
+                request.session['role'] = 'manager'
                 return redirect('managerHome')
             elif user is not None and UserDatabase.objects.filter(
                     Username=username).exists() and 'userSubmit' in request.POST:
                 login(request, user)
+                request.session['role'] = 'user'
                 return redirect('userHome')
             else:
                 messages.info(request, 'Username OR password is incorrect')
@@ -68,47 +191,56 @@ def logout_page(request):
 
 
 def change_car_model(request):
-    results = GetCarModel.objects.all()
+    results = car_catalogue()
     current_user = request.user.username
-    filterObj = UserDatabase.objects.get(Username=current_user)
     if request.method == 'POST':
-        if request.POST.get('Car'):
-            filterObj.Car = request.POST.get('Car')
-            filterObj.save()
+        if request.POST.get('Car') in results:
+            UserDatabase.objects.filter(Username=current_user).update(
+                Car_id=request.POST.get('Car'))
+            pin_to_primary(request)
             messages.success(request, 'Car successfully changed')
         else:
             messages.info(request, "Please select a vehicle")
 
-    context = {'currentUser': current_user, 'Car': results}
+    context = {'currentUser': current_user, 'Car': results.values()}
     return render(request, 'changeCarModel.html', context)
 
 
 def register(request):
-    results = GetCarModel.objects.all()
+    results = car_catalogue()
     if request.user.is_authenticated:
         return redirect('login')
     else:
         form = CreateUserForm()
         if request.method == 'POST':
             form = CreateUserForm(request.POST)
-            if form.is_valid() and request.POST.get('Car'):
+            if form.is_valid() and request.POST.get('Car') in results:
                 form.save()
-                saveRecord = UserDatabase()
                 user = form.cleaned_data.get('username')
                 placeholder = "1234-12-23 11:23:40"
                 placeholder = timezone.make_aware(
                     datetime.fromisoformat(placeholder),
                     timezone.get_default_timezone())
-                saveRecord.Username = user
-                saveRecord.Car = request.POST.get('Car')
-                saveRecord.save()
-                filterObj = UserDatabase.objects.get(Username=user)
-                filterObj.Scheduled_Datetime_Start = placeholder
-                filterObj.Scheduled_Datetime_End = placeholder
-                filterObj.Arrival = placeholder
-                filterObj.Preferred_Start_Datetime = placeholder
-                filterObj.Preferred_End_Datetime = placeholder
-                filterObj.save()
+                # Every column of userdata is NOT NULL, so the row is
+                # created with placeholders until the user's first booking
+                UserDatabase.objects.create(
+                    Username=user,
+                    Car_id=request.POST.get('Car'),
+                    Current_Charge=0,
+                    Preferred_Charge_Station=0,
+                    Preferred_Start_Datetime=placeholder,
+                    Preferred_End_Datetime=placeholder,
+                    Preferred_Charge_Level=0,
+                    Scheduled_Datetime_Start=placeholder,
+                    Scheduled_Datetime_End=placeholder,
+                    Charging_Station=0,
+                    Final_Charge=0,
+                    Is_Scheduling=False,
+                    Arrival=placeholder,
+                    Slot_Taken=False,
+                    New_Sugg_Start=placeholder,
+                    New_Sugg_End=placeholder,
+                    Error=0)
                 messages.success(request,
                                  'Account was created for User: ' + user)
 
@@ -117,7 +249,7 @@ def register(request):
                 if form.is_valid() is True:
                     messages.info(request, "Please select a vehicle")
 
-        context = {'form': form, 'Car': results}
+        context = {'form': form, 'Car': results.values()}
         return render(request, 'register.html', context)
 
 
@@ -145,8 +277,10 @@ def manager_register(request):
 def user_home(request):
     error = False
     chargeWrong = False
+    schedulingBooking = None
     current_user = request.user.username
-    filterObj = UserDatabase.objects.get(Username=current_user)
+    filterObj = UserDatabase.objects.only(*USER_HOME_FIELDS).get(
+        Username=current_user)
 
     current = timezone.make_aware(datetime.now(),
                                   timezone.get_default_timezone())
@@ -165,7 +299,10 @@ def user_home(request):
                 timezone.get_default_timezone())
             filterObj.Scheduled_Datetime_Start = placeholder
             filterObj.Scheduled_Datetime_End = placeholder
-            filterObj.save()
+            filterObj.save(update_fields=['Scheduled_Datetime_Start',
+                                          'Scheduled_Datetime_End'])
+            bump_station_versions([filterObj.Charging_Station])
+            pin_to_primary(request)
             messages.success(request, "Slot successfully freed")
         else:
 
@@ -219,54 +356,18 @@ def user_home(request):
                     'prefCharge')
                 filterObj.Is_Scheduling = '1'
                 filterObj.Arrival = current
-                filterObj.save()
-
-                isScheduled = 0
-
-                while isScheduled == 0:
-                    isScheduled = UserDatabase.objects.filter(
-                        Username=current_user,
-                        Is_Scheduling='0').count()
-
-                doneSuggestion = UserDatabase.objects.filter(
-                    Username=current_user,
-                    Slot_Taken='1').count()
-                unableToSchedule = UserDatabase.objects.filter(
-                    Username=current_user, Error='1').count()
-
-                if unableToSchedule == 1:
-                    messages.error(request,
-                                   "Unfortunately the scheduler wasn't able to generate a valid time for you, due to energy consumption being too high at the given time.")
-                    messages.error(request,
-                                   "Please enter a different preferred time and try again.")
-                    userObj = UserDatabase.objects.get(Username=current_user)
-                    userObj.Error = '0'
-                    userObj.save()
-
-                elif doneSuggestion == 1:
-                    takenObject = UserDatabase.objects.get(
-                        Username=current_user,
-                        Slot_Taken='1')
-                    suggestedStart = str(takenObject.New_Sugg_Start)
-                    suggestedStart = suggestedStart[:19]
-                    suggestedStart = datetime.strptime(suggestedStart,
-                                                       '%Y-%m-%d %H:%M:%S')
-                    suggestedEnd = str(takenObject.New_Sugg_End)
-                    suggestedEnd = suggestedEnd[:19]
-                    suggestedEnd = datetime.strptime(suggestedEnd,
-                                                     '%Y-%m-%d %H:%M:%S')
-                    string1 = f"Suggested start time: {suggestedStart}"
-                    string2 = f"Suggested end time: {suggestedEnd}"
-                    messages.error(request,
-                                   "Please enter a different preferred time as your suggested time has already been taken.")
-                    messages.error(request, string1)
-                    messages.error(request, string2)
-                    userObj = UserDatabase.objects.get(Username=current_user)
-                    userObj.Slot_Taken = '0'
-                    userObj.save()
-
-                else:
-                    return redirect('userScheduled')
+                filterObj.save(update_fields=[
+                    'Preferred_Charge_Station', 'Preferred_Start_Datetime',
+                    'Preferred_End_Datetime', 'Current_Charge',
+                    'Preferred_Charge_Level', 'Is_Scheduling', 'Arrival'])
+                # The manager tables show the preferences
+                bump_station_versions([filterObj.Charging_Station])
+                pin_to_primary(request)
+                notify_scheduler()
+
+                # The page waits for the result through booking_status, so
+                # this request does not hold a web worker while it solves
+                schedulingBooking = filterObj.id
 
     if filterObj.Scheduled_Datetime_End < current:
         context = {'UserDatabase': None, 'currentDate': now,
@@ -274,18 +375,65 @@ def user_home(request):
     else:
         context = {'UserDatabase': filterObj, 'currentDate': now,
                    'finalDate': finalDate, 'currentUser': current_user}
+    context['schedulingBooking'] = schedulingBooking
 
     return render(request, 'userHome.html', context)
 
 
+async def booking_status(request, booking_id):
+    # GET long-polls the scheduling of a booking without changing it: answers
+    # as soon as the booking is scheduled, or after BOOKING_STATUS_WAIT
+    # seconds with 'scheduling' so the page asks again. Each check reads all
+    # the status flags in one query, on any of the executor's threads rather
+    # than the thread shared by the sync views (see async_read).
+    # The page acknowledges a failed or suggested result with a POST, which
+    # clears it and queues the messages for the page shown next
+    if request.method not in ('GET', 'POST'):
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    username = await async_read(lambda: request.user.username)()
+    booking = UserDatabase.objects.filter(
+        id=booking_id, Username=username).values(*BOOKING_STATUS_FIELDS)
+    deadline = time.monotonic() + settings.BOOKING_STATUS_WAIT
+    status = await async_read(booking.first)()
+    if status is None:
+        return JsonResponse({'status': 'unknown'}, status=404)
+
+    if request.method == 'POST':
+        if status['Is_Scheduling']:
+            return JsonResponse({'status': 'scheduling'})
+        result = await sync_to_async(report_booking_result)(
+            request, booking_id, status)
+        return JsonResponse({'status': result})
+
+    while status['Is_Scheduling']:
+        if time.monotonic() >= deadline:
+            return JsonResponse({'status': 'scheduling'})
+        await asyncio.sleep(settings.BOOKING_STATUS_INTERVAL)
+        status = await async_read(booking.first)()
+
+    # The worker wrote the schedule to the primary, so the user's next pages
+    # read it from there
+    await sync_to_async(pin_to_primary)(request)
+    return JsonResponse({'status': booking_result(status)})
+
+
+@read_from_replica
 def user_scheduled(request):
     current_user = request.user.username
-    filterObj = UserDatabase.objects.get(Username=request.user.username)
-    currentCharge = int(filterObj.Current_Charge)
-    prefChargeLevel = int(filterObj.Preferred_Charge_Level)
-    finalCharge = int(filterObj.Final_Charge)
+
+    # The version of the user's station is read along with the row. A user's
+    # schedule only changes along with it, so the rendered schedule is cached
+    # until the station's version changes
+    stationVersion = StationVersion.objects.filter(
+        Station=OuterRef('Charging_Station')).values('Version')[:1]
+    filterObj = UserDatabase.objects.filter(Username=current_user).annotate(
+        Station_Version=Subquery(stationVersion)).values(
+        *USER_SCHEDULED_FIELDS, 'Station_Version').get()
+    currentCharge = int(filterObj['Current_Charge'])
+    prefChargeLevel = int(filterObj['Preferred_Charge_Level'])
+    finalCharge = int(filterObj['Final_Charge'])
     difference = prefChargeLevel - currentCharge
-    chargeStation = int(filterObj.Charging_Station)
+    chargeStation = int(filterObj['Charging_Station'])
 
     if chargeStation == 1:
         lat = 52.95423
@@ -299,14 +447,384 @@ def user_scheduled(request):
                        "A time has been scheduled however your preferred charge preferences weren't met")
 
     context = {'UserDatabase': filterObj, 'MapLat': lat, 'MapLong': long,
-               'Station': chargeStation, 'currentUser': current_user}
+               'Station': chargeStation, 'currentUser': current_user,
+               'fragment': f"{chargeStation}:"
+                           f"{filterObj['Station_Version'] or 0}",
+               'fragmentSeconds': settings.SCHEDULE_CACHE_SECONDS}
     return render(request, 'userScheduled.html', context)
 
 
+def api_user(request):
+    # Fleet API clients are scripts, so they log in with HTTP basic
+    # authentication on every request instead of a session
+    method, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', '').partition(' ')
+    if method.lower() != 'basic':
+        return None
+    try:
+        username, _, password = base64.b64decode(
+            credentials).decode('utf-8').partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=username, password=password)
+
+
+def parse_fleet_datetime(value):
+    dateTime = datetime.fromisoformat(value)
+    if timezone.is_naive(dateTime):
+        dateTime = timezone.make_aware(dateTime,
+                                       timezone.get_default_timezone())
+    return dateTime
+
+
+def fleet_username(owner, reference):
+    # Each vehicle of a fleet is stored as a booking of its own, named after
+    # the fleet's owner and the vehicle's reference
+    return f"{owner}#{reference}"
+
+
+def validate_fleet_vehicle(vehicle, carModels, current, owner):
+    # Applies the checks of the booking form in user_home to one vehicle of
+    # a fleet booking, and returns the vehicle's errors
+    errors = []
+    if not isinstance(vehicle, dict):
+        return ["Each vehicle must be a JSON object."]
+
+    for field in ('reference', 'car', 'station', 'arrival', 'departure',
+                  'current_charge', 'target_charge'):
+        if field not in vehicle:
+            errors.append(f"Missing field: {field}.")
+    if errors:
+        return errors
+
+    reference = vehicle['reference']
+    if not isinstance(reference, str) or not reference:
+        errors.append("Reference must be a non-empty string.")
+    elif len(fleet_username(owner, reference)) > \
+            UserDatabase._meta.get_field('Username').max_length:
+        errors.append("Reference is too long.")
+    if not isinstance(vehicle['car'], str) \
+            or vehicle['car'] not in carModels:
+        errors.append("Unknown car model.")
+    station = vehicle['station']
+    if not isinstance(station, int) or isinstance(station, bool) \
+            or station not in settings.CHARGING_STATIONS:
+        errors.append("Unknown charging station.")
+
+    try:
+        arrival = parse_fleet_datetime(vehicle['arrival'])
+        departure = parse_fleet_datetime(vehicle['departure'])
+    except (TypeError, ValueError):
+        errors.append("Arrival and departure must be ISO 8601 datetimes.")
+    else:
+        if arrival < current:
+            errors.append("Arrival must not be in the past.")
+        if arrival + timedelta(minutes=15) > departure:
+            errors.append(
+                "Departure must be at least 15 minutes after arrival.")
+        if arrival + timedelta(hours=6) < departure:
+            errors.append(
+                "Departure must be at most 6 hours after arrival.")
+
+    currentCharge = vehicle['current_charge']
+    targetCharge = vehicle['target_charge']
+    if not all(isinstance(charge, int) and not isinstance(charge, bool)
+               and 0 <= charge <= 100
+               for charge in (currentCharge, targetCharge)):
+        errors.append("Charges must be whole percentages from 0 to 100.")
+    elif targetCharge - currentCharge <= 1:
+        errors.append(
+            "Target charge must be more than 1 higher than current charge.")
+
+    return errors
+
+
+@csrf_exempt
+@require_POST
+def fleet_bookings(request):
+    # Books charging for a fleet of vehicles at once. Valid vehicles are
+    # queued as one fleet job, which the scheduler worker schedules in a
+    # single solve
+    user = api_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required.'},
+                            status=401)
+
+    try:
+        vehicles = json.loads(request.body)['vehicles']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {'error': 'Expected a JSON object with a list of vehicles.'},
+            status=400)
+    if not isinstance(vehicles, list) or not vehicles:
+        return JsonResponse({'error': 'No vehicles given.'}, status=400)
+    if len(vehicles) > settings.FLEET_MAX_VEHICLES:
+        return JsonResponse(
+            {'error': f"At most {settings.FLEET_MAX_VEHICLES} vehicles "
+                      f"can be booked at once."}, status=400)
+
+    current = timezone.now()
+    carModels = car_catalogue()
+    results = []
+    validVehicles = []
+    references = set()
+    for vehicle in vehicles:
+        errors = validate_fleet_vehicle(vehicle, carModels, current,
+                                        user.username)
+        reference = vehicle.get('reference') \
+            if isinstance(vehicle, dict) else None
+        if isinstance(reference, str):
+            if reference in references:
+                errors.append("Duplicate reference.")
+            references.add(reference)
+
+        results.append({'reference': reference,
+                        'status': 'rejected' if errors else 'queued',
+                        'errors': errors})
+        if not errors:
+            validVehicles.append(vehicle)
+
+    # The scheduler forecasts one day at a time
+    arrivals = [parse_fleet_datetime(vehicle['arrival'])
+                for vehicle in validVehicles]
+    departures = [parse_fleet_datetime(vehicle['departure'])
+                  for vehicle in validVehicles]
+    if validVehicles and \
+            max(departures) - min(arrivals) > timedelta(days=1):
+        return JsonResponse(
+            {'error': 'All vehicles must arrive and leave within one day.',
+             'vehicles': results}, status=400)
+
+    if not validVehicles:
+        return JsonResponse({'vehicles': results}, status=400)
+
+    placeholder = timezone.make_aware(
+        datetime.fromisoformat("1234-12-23 11:23:40"),
+        timezone.get_default_timezone())
+    with transaction.atomic():
+        fleetJob = FleetJob.objects.create(Owner=user.username)
+        UserDatabase.objects.bulk_create([
+            UserDatabase(
+                Username=fleet_username(user.username,
+                                        vehicle['reference']),
+                Car_id=vehicle['car'],
+                Current_Charge=vehicle['current_charge'],
+                Preferred_Charge_Station=vehicle['station'],
+                Preferred_Start_Datetime=arrival,
+                Preferred_End_Datetime=departure,
+                Preferred_Charge_Level=vehicle['target_charge'],
+                Scheduled_Datetime_Start=placeholder,
+                Scheduled_Datetime_End=placeholder,
+                Charging_Station=vehicle['station'],
+                Final_Charge=0,
+                Is_Scheduling=True,
+                Arrival=current,
+                Slot_Taken=False,
+                New_Sugg_Start=placeholder,
+                New_Sugg_End=placeholder,
+                Error=0,
+                Fleet_Job=fleetJob)
+            for vehicle, arrival, departure in zip(validVehicles, arrivals,
+                                                   departures)])
+        bump_station_versions(
+            vehicle['station'] for vehicle in validVehicles)
+        transaction.on_commit(notify_scheduler)
+
+    return JsonResponse({'job': fleetJob.id, 'vehicles': results},
+                        status=202)
+
+
+def fleet_job_results(job_id, owner):
+    # The result of scheduling each vehicle of a fleet job, or None if the
+    # owner has no such job
+    if not FleetJob.objects.filter(id=job_id, Owner=owner).exists():
+        return None
+
+    results = []
+    for vehicle in UserDatabase.objects.filter(Fleet_Job=job_id).values(
+            'Username', 'Is_Scheduling', 'Error', 'Slot_Taken',
+            'Scheduled_Datetime_Start', 'Scheduled_Datetime_End',
+            'Charging_Station', 'Final_Charge', 'New_Sugg_Start',
+            'New_Sugg_End'):
+        result = {'reference': vehicle['Username'].partition('#')[2]}
+        if vehicle['Is_Scheduling']:
+            result['status'] = 'scheduling'
+        elif vehicle['Error'] == 1:
+            result['status'] = 'failed'
+        elif vehicle['Slot_Taken']:
+            result.update(status='suggested',
+                          suggested_start=vehicle['New_Sugg_Start'],
+                          suggested_end=vehicle['New_Sugg_End'])
+        else:
+            result.update(status='scheduled',
+                          start=vehicle['Scheduled_Datetime_Start'],
+                          end=vehicle['Scheduled_Datetime_End'],
+                          station=vehicle['Charging_Station'],
+                          final_charge=vehicle['Final_Charge'])
+        results.append(result)
+    return results
+
+
+async def fleet_booking_status(request, job_id):
+    # Reports the result of scheduling each vehicle of a fleet job. Fleet
+    # clients poll this, so the password check and the queries run on any
+    # of the executor's threads (see async_read)
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await async_read(api_user)(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required.'},
+                            status=401)
+    results = await async_read(fleet_job_results)(job_id, user.username)
+    if results is None:
+        return JsonResponse({'error': 'Unknown fleet job.'}, status=404)
+
+    scheduling = any(result['status'] == 'scheduling' for result in results)
+    return JsonResponse({'job': job_id,
+                         'status': 'scheduling' if scheduling else 'done',
+                         'vehicles': results})
+
+
+def parse_filter_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def utilisation_versions():
+    # Every version the utilisation report depends on. The worker moves a
+    # station's version on with every schedule it writes, and the forecast
+    # version with every forecast it loads
+    forecast = CacheVersion.objects.filter(Name='forecast').values_list(
+        'Version', flat=True).first()
+    return f"{station_versions()}-f{forecast or 0}"
+
+
+def compute_utilisation(start, end):
+    # Aggregates the scheduled charging of each station and time slot in the
+    # database, and joins it with the forecast of each slot
+    with connections[router.db_for_read(UserTimes)].cursor() as cursor:
+        cursor.execute(
+            "SELECT u.Charging_Station, t.Timeslots, COUNT(*), "
+            "SUM(t.chargeInSlot) FROM userTimes t "
+            "JOIN userdata u ON u.id = t.idEV "
+            "WHERE t.Timeslots >= %s AND t.Timeslots < %s "
+            "GROUP BY u.Charging_Station, t.Timeslots", [start, end])
+        charging = cursor.fetchall()
+        cursor.execute(
+            "SELECT Timeslot, Traditional_Production, Renewable_Production, "
+            "Max_Capacity FROM slotforecast "
+            "WHERE Timeslot >= %s AND Timeslot < %s", [start, end])
+        forecasts = {timeslot: (traditional, renewable, capacity)
+                     for timeslot, traditional, renewable, capacity
+                     in cursor.fetchall()}
+
+    slots = dict()
+    for station, timeslot, vehicles, kwh in charging:
+        slot = slots.setdefault(timeslot, {'vehicles': 0, 'kwh': 0.0,
+                                           'stations': {}})
+        slot['vehicles'] += vehicles
+        slot['kwh'] += float(kwh)
+        slot['stations'][station] = {'vehicles': vehicles,
+                                     'kwh': float(kwh)}
+
+    results = []
+    for timeslot in sorted(set(slots) | set(forecasts)):
+        slot = slots.get(timeslot, {'vehicles': 0, 'kwh': 0.0,
+                                    'stations': {}})
+        traditional, renewable, capacity = forecasts.get(
+            timeslot, (None, None, None))
+        production = (traditional or 0) + (renewable or 0)
+        slot.update(
+            slot=timeslot.strftime("%Y-%m-%dT%H:%M"),
+            headroom=None if capacity is None else capacity - slot['kwh'],
+            renewable_share=renewable / production if production else None)
+        results.append(slot)
+    return results
+
+
+def utilisation_report(fromDate, toDate):
+    # The cached report is replaced as soon as a version changes, so it never
+    # outlives the schedules it was computed from
+    key = f"utilisation:{fromDate}:{toDate}:{utilisation_versions()}"
+    slots = cache.get(key)
+    if slots is None:
+        # userTimes holds the naive local times written by the worker
+        slots = compute_utilisation(
+            datetime.combine(fromDate, datetime.min.time()),
+            datetime.combine(toDate + timedelta(days=1),
+                             datetime.min.time()))
+        cache.set(key, slots, settings.UTILISATION_CACHE_SECONDS)
+    return slots
+
+
+@read_from_replica
+async def station_utilisation(request):
+    # Per station and per time slot charging aggregates for the manager
+    # dashboard, for the days from 'from' to 'to' (inclusive, a week from
+    # today by default)
+    if await async_read(user_role)(request) != 'manager':
+        return JsonResponse({'error': 'Managers only.'}, status=403)
+
+    today = timezone.localdate()
+    fromDate = parse_filter_date(request.GET.get('from')) or today
+    toDate = parse_filter_date(request.GET.get('to')) or \
+        fromDate + timedelta(days=6)
+    if toDate < fromDate or toDate - fromDate > timedelta(
+            days=settings.UTILISATION_MAX_DAYS):
+        return JsonResponse({'error': 'Invalid date range.'}, status=400)
+
+    slots = await async_read(utilisation_report)(fromDate, toDate)
+    return JsonResponse({'from': fromDate, 'to': toDate, 'slots': slots})
+
+
+def station_table(config, bookings, station):
+    # The template calls this only when the station's table is not cached,
+    # so cached tables are served without querying the bookings
+    table = UserTable(bookings.filter(Charging_Station=station),
+                      prefix=f"station{station}-")
+    config.configure(table)
+    return table
+
+
+@read_from_replica
 def manager_home(request):
     current_user = request.user.username
-    station1 = UserTable(UserDatabase.objects.filter(Charging_Station=1))
-    station2 = UserTable(UserDatabase.objects.filter(Charging_Station=2))
-    context = {'table': station1, 'table2': station2,
-               'currentUser': current_user}
+
+    # Bookings overlapping the chosen dates, filtered in the query on
+    # datetime bounds so that the station and period index can be used
+    bookings = UserDatabase.objects.only(*UserTable.Meta.fields)
+    fromDate = parse_filter_date(request.GET.get('from'))
+    toDate = parse_filter_date(request.GET.get('to'))
+    if fromDate is not None:
+        bookings = bookings.filter(
+            Scheduled_Datetime_End__gte=timezone.make_aware(
+                datetime.combine(fromDate, datetime.min.time())))
+    if toDate is not None:
+        bookings = bookings.filter(
+            Scheduled_Datetime_Start__lt=timezone.make_aware(
+                datetime.combine(toDate + timedelta(days=1),
+                                 datetime.min.time())))
+
+    # One table per station, each sorted and paginated by its own query
+    # string parameters so that the tables can be paged separately. Each
+    # rendered table is cached in the template, keyed on its station's
+    # version and the whole query string, as the table's sort and page links
+    # carry the other table's parameters too
+    tables = []
+    config = RequestConfig(
+        request, paginate={'per_page': settings.MANAGER_TABLE_PER_PAGE})
+    versions = dict(StationVersion.objects.values_list('Station', 'Version'))
+    query = urlencode(sorted((name, value)
+                             for name, values in request.GET.lists()
+                             for value in values))
+    for station in settings.CHARGING_STATIONS:
+        fragment = f"{station}:{versions.get(station, 0)}:{query}"
+        tables.append((station, partial(station_table, config, bookings,
+                                        station), fragment))
+
+    context = {'tables': tables, 'currentUser': current_user,
+               'fromDate': fromDate, 'toDate': toDate,
+               'fragmentSeconds': settings.SCHEDULE_CACHE_SECONDS}
     return render(request, 'managerHome.html', context)
@@ -0,0 +1,112 @@
+import os
+import random
+import time
+
+import mysql.connector.pooling
+
+from contextlib import contextmanager
+from mysql.connector import errors
+
+HOST = "schedulerdb.cv1vtvg9bql2.eu-west-2.rds.amazonaws.com"
+USER = "admin"
+PASSWORD = "password"
+DATABASE = "Scheduler"
+
+POOL_SIZE = 4
+CONNECT_TIMEOUT = 10  # seconds
+STATEMENT_TIMEOUT = 30000  # milliseconds, only applies to SELECT statements
+
+# Errors after which a new connection can succeed (the database went away, or the pool is exhausted for a moment)
+CONNECTION_ERRORS = (errors.InterfaceError, errors.OperationalError, errors.PoolError)
+
+_pool = None
+_pool_pid = None
+
+
+def get_pool():
+    """Returns the connection pool of the current process, creating it on first use. Processes started from a worker
+    (see run_lp_scheduler.main) get their own pool rather than sharing the parent's connections.
+
+    Returns:
+        A MySQLConnectionPool connected to the Scheduler database.
+    """
+    global _pool, _pool_pid
+
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = mysql.connector.pooling.MySQLConnectionPool(pool_name="scheduler_{}".format(os.getpid()),
+                                                            pool_size=POOL_SIZE,
+                                                            host=HOST,
+                                                            user=USER,
+                                                            passwd=PASSWORD,
+                                                            database=DATABASE,
+                                                            connection_timeout=CONNECT_TIMEOUT)
+        _pool_pid = os.getpid()
+
+    return _pool
+
+
+def backoff_delays(attempts, base=0.5, cap=30):
+    """Generates the delays to wait between retries: exponential backoff with jitter, so that workers that lost their
+    connections at the same time do not all reconnect at the same time.
+
+    Args:
+        attempts: An int as the number of delays to generate.
+        base: The delay before the first retry in seconds.
+        cap: The longest delay in seconds.
+
+    Returns:
+        A generator of delays in seconds.
+    """
+    for attempt in range(attempts):
+        yield min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def get_connection(attempts=5):
+    """Takes a connection from the pool and checks that it is still alive, reconnecting it if it is not. Each
+    connection is given the statement timeout.
+
+    Args:
+        attempts: An int as the number of times to try before giving up.
+
+    Returns:
+        A PooledMySQLConnection, which is returned to the pool when closed.
+
+    Raises:
+        mysql.connector.Error: If no connection could be made in any of the attempts.
+    """
+    for delay in backoff_delays(attempts - 1):
+        try:
+            return _open_connection()
+        except CONNECTION_ERRORS as e:
+            print("Database connection failed, retrying in {:.1f} seconds: {}".format(delay, e))
+            time.sleep(delay)
+
+    return _open_connection()
+
+
+@contextmanager
+def connection():
+    """Lends a connection from the pool for the duration of a with block.
+
+    Yields:
+        A PooledMySQLConnection.
+    """
+    db = get_connection()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _open_connection():
+    db = get_pool().get_connection()
+    try:
+        db.ping(reconnect=True, attempts=1, delay=0)
+        cursor = db.cursor()
+        cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (STATEMENT_TIMEOUT,))
+        cursor.close()
+    except Exception:
+        db.close()
+        raise
+
+    return db
@@ -1,6 +1,7 @@
 import numpy as np
 import random
-import mysql.connector
+
+from database.connection_pool import connection
 
 
 class GridLoadGenerator:
@@ -20,14 +21,11 @@ class GridLoadGenerator:
         Returns:
             A numpy array of grid load values from a database.
         """
-        db = mysql.connector.connect(host="schedulerdb.cv1vtvg9bql2.eu-west-2.rds.amazonaws.com", user="admin",
-                                     passwd="password", _database="Scheduler")
-
-        cursor = db.cursor()
-
-        cursor.execute("SELECT Predicted_Load FROM grid_load_weekday")
-
-        results = cursor.fetchall()
+        with connection() as db:
+            cursor = db.cursor()
+            cursor.execute("SELECT Predicted_Load FROM grid_load_weekday")
+            results = cursor.fetchall()
+            cursor.close()
 
         data = np.asarray(results)
         data = data.astype(float)
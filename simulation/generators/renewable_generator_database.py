@@ -1,6 +1,7 @@
 import numpy as np
 import random
-import mysql.connector
+
+from database.connection_pool import connection
 
 
 class RenewableGenerator:
@@ -15,14 +16,11 @@ class RenewableGenerator:
         self.generated_data = self.apply_deviation()
 
     def _read_database_values(self):
-        db = mysql.connector.connect(host="schedulerdb.cv1vtvg9bql2.eu-west-2.rds.amazonaws.com", user="admin",
-                                     passwd="password", database="Scheduler")
-
-        cursor = db.cursor()
-
-        cursor.execute("SELECT Solar_Generation_Percent FROM wind_solar_perc")
-
-        results = cursor.fetchall()
+        with connection() as db:
+            cursor = db.cursor()
+            cursor.execute("SELECT Solar_Generation_Percent FROM wind_solar_perc")
+            results = cursor.fetchall()
+            cursor.close()
 
         data = np.asarray(results)
         data = data.astype(float)
@@ -0,0 +1,141 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+
+class StationBookings:
+    """The committed bookings of one charging station, sorted by start. Bookings at a station never overlap, because
+    every booking is checked for clashes before it is written, so the ends are sorted as well and a clash can be found
+    with a binary search.
+
+    Attributes:
+        version: The version of the station's bookings in the database the bookings were loaded at.
+    """
+    def __init__(self, bookings=(), version=0):
+        self.version = version
+        self._starts = []
+        self._ends = []
+        self._ev_ids = []
+        self._start_of = dict()
+        for ev_id, start, end in bookings:
+            self.add(ev_id, start, end)
+
+    def __len__(self):
+        return len(self._ev_ids)
+
+    def add(self, ev_id, start, end):
+        """Adds the booking of a vehicle, replacing the vehicle's previous booking at the station.
+
+        Args:
+            ev_id: An int as the ID of the vehicle.
+            start: A datetime object as the start of charging.
+            end: A datetime object as the end of charging.
+        """
+        self.remove(ev_id)
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._ev_ids.insert(i, ev_id)
+        self._start_of[ev_id] = start
+
+    def remove(self, ev_id):
+        """Removes the booking of a vehicle, if it has one at the station.
+
+        Args:
+            ev_id: An int as the ID of the vehicle.
+        """
+        start = self._start_of.pop(ev_id, None)
+        if start is None:
+            return
+
+        i = bisect_left(self._starts, start)
+        while self._ev_ids[i] != ev_id:
+            i += 1
+        del self._starts[i], self._ends[i], self._ev_ids[i]
+
+    def find_clash(self, start, end, ev_id=None):
+        """Finds a booking of another vehicle that overlaps the given period.
+
+        Args:
+            start: A datetime object as the start of the period.
+            end: A datetime object as the end of the period.
+            ev_id: An int as the ID of the vehicle being scheduled, whose own booking is not a clash.
+
+        Returns:
+            A datetime object as the end of the clashing booking that starts last, or None if nothing clashes.
+        """
+        # Of the bookings starting before the end of the period, the last one also ends last
+        i = bisect_left(self._starts, end) - 1
+        if i >= 0 and self._ev_ids[i] == ev_id:
+            i -= 1
+        if i >= 0 and self._ends[i] > start:
+            return self._ends[i]
+        return None
+
+    def find_free_period(self, start, duration, ev_id=None):
+        """Finds the earliest period of the given length, starting no earlier than start, that does not clash with any
+        booking of another vehicle.
+
+        Args:
+            start: A datetime object as the earliest start of the period.
+            duration: A timedelta object as the length of the period.
+            ev_id: An int as the ID of the vehicle being scheduled.
+
+        Returns:
+            A tuple of datetime objects as the start and end of the period.
+        """
+        clash_end = self.find_clash(start, start + duration, ev_id)
+        while clash_end is not None:
+            start = clash_end
+            clash_end = self.find_clash(start, start + duration, ev_id)
+        return start, start + duration
+
+
+class BookingIndex:
+    """In-memory index of the committed bookings of each charging station, so that the worker can check for clashes
+    and find alternative periods without querying every booking of the station.
+
+    The index of a station is loaded when it is first used and loaded again whenever the station's version in the
+    database shows that another worker or the web application changed its bookings. It must only be used while
+    holding the station's lock (see SchedulerDatabase.station_lock).
+
+    Attributes:
+        database: The SchedulerDatabase to load bookings from.
+    """
+    def __init__(self, database):
+        self.database = database
+        self._stations = dict()
+
+    def station(self, station):
+        """Returns the up to date bookings of a charging station.
+
+        Args:
+            station: An int as the ID of the charging station, as stored in the database.
+
+        Returns:
+            A StationBookings object.
+        """
+        version = self.database.fetch_station_version(station)
+        bookings = self._stations.get(station)
+        if bookings is None or bookings.version != version:
+            # Bookings that have already ended cannot clash with a new one
+            bookings = StationBookings(self.database.fetch_station_bookings(station, datetime.now()), version)
+            self._stations[station] = bookings
+        return bookings
+
+    def record(self, results):
+        """Adds bookings that have just been written with SchedulerDatabase.save_schedules, which also moved their
+        stations on to the next version.
+
+        Args:
+            results: A list of BookingResult tuples that were written.
+        """
+        for station in {result.station for result in results}:
+            if station in self._stations:
+                self._stations[station].version += 1
+        for result in results:
+            for station, bookings in self._stations.items():
+                if station == result.station:
+                    bookings.add(result.ev_id, result.start, result.end)
+                else:
+                    # The vehicle's booking moved from another station
+                    bookings.remove(result.ev_id)
@@ -0,0 +1,175 @@
+import os
+import threading
+
+import numpy as np
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# The files written by BMRSAPIRequest and read by APIResultParser and ConsumptionTariffGenerator
+FORECAST_PATHS = [str(Path().resolve().parent) + "\\simulation_files\\" + name
+                  for name in ["renewable_day_ahead.csv", "renewable_now.csv", "aggr_gen_ahead.csv", "actual_gen_now.csv",
+                               "household_consumption.csv"]]
+
+Forecast = namedtuple("Forecast", ["settlement_date", "loaded_at", "traditional_production", "consumption",
+                                   "renewable_production"])
+
+
+def download_forecast():
+    """Downloads the BMRS files of the current settlement date."""
+    from generators.simple_api_request import BMRSAPIRequest
+
+    BMRSAPIRequest()
+
+
+def load_forecast():
+    """Parses the downloaded BMRS files and the household consumption file.
+
+    Returns:
+        A tuple of NumPy arrays of the traditional production, consumption and renewable production of each time slot.
+    """
+    # The files are read when the parser and generator are created, from paths parse_csv builds when imported
+    from generators.parse_csv import APIResultParser
+    from generators.local_consumption_generator import ConsumptionTariffGenerator
+
+    parser = APIResultParser()
+    consumption = ConsumptionTariffGenerator()
+    return (np.asarray(parser.quantity_array_now, dtype=float),
+            np.asarray(consumption.data_array, dtype=float),
+            np.asarray(parser.renewable48, dtype=float))
+
+
+class ForecastCache:
+    """Cache of the production and consumption forecasts used to schedule bookings, so that scheduling a booking
+    does not download or parse any files.
+
+    The forecast of a settlement date is downloaded and parsed once, then reused until it is older than max_age (the
+    BMRS data changes at most once per settlement period) or one of the files it was parsed from changes. A background
+    thread can keep the forecast fresh (see start), in which case get only loads data itself on the first call of a
+    new day.
+
+    Attributes:
+        max_age: A timedelta object as the time after which a forecast is downloaded again.
+        download: A function downloading the BMRS files.
+        load: A function returning the traditional production, consumption and renewable production arrays parsed
+              from the files.
+        paths: A list of paths of the files the forecast is parsed from.
+        clock: A function returning the current datetime.
+        on_refresh: A function called with each newly loaded Forecast, or None.
+    """
+    def __init__(self, max_age=timedelta(minutes=30), download=download_forecast, load=load_forecast,
+                 paths=FORECAST_PATHS, clock=datetime.now, on_refresh=None):
+        self.max_age = max_age
+        self.download = download
+        self.load = load
+        self.paths = paths
+        self.clock = clock
+        self.on_refresh = on_refresh
+
+        self._forecasts = dict()
+        self._mtimes = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self):
+        """Returns the forecast of the current settlement date, loading it first if it is missing, or if it is stale
+        and no background thread is refreshing it.
+
+        Returns:
+            A Forecast.
+        """
+        settlement_date = self.clock().date()
+        forecast = self._forecasts.get(settlement_date)
+        if forecast is None or (self._thread is None and self._is_stale(forecast)):
+            forecast = self.refresh()
+
+        return forecast
+
+    def refresh(self, download=True):
+        """Loads the forecast of the current settlement date and replaces any cached forecasts.
+
+        Args:
+            download: Whether to download the BMRS files again before parsing them.
+
+        Returns:
+            The loaded Forecast.
+        """
+        with self._lock:
+            settlement_date = self.clock().date()
+            if download:
+                try:
+                    self.download()
+                except OSError as e:
+                    # Includes the requests exceptions. Fall back to the files downloaded last time
+                    print("Forecast download failed:", e)
+
+            self._mtimes = self._read_mtimes()
+            forecast = Forecast(settlement_date, self.clock(), *self.load())
+            self._forecasts = {settlement_date: forecast}
+
+        if self.on_refresh is not None:
+            try:
+                self.on_refresh(forecast)
+            except Exception as e:
+                # The forecast is still used for scheduling
+                print("Forecast refresh callback failed:", e)
+
+        return forecast
+
+    def start(self, interval=timedelta(minutes=5)):
+        """Starts a background thread that refreshes stale forecasts, so that get does not have to.
+
+        Args:
+            interval: A timedelta object as the time between checks for a stale forecast.
+        """
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_periodically, args=(interval.total_seconds(),),
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread started by start."""
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _is_stale(self, forecast):
+        """Checks whether a forecast has to be loaded again.
+
+        Args:
+            forecast: The cached Forecast.
+
+        Returns:
+            True if the forecast is older than max_age or the files have changed since it was loaded.
+        """
+        return self.clock() - forecast.loaded_at > self.max_age or self._read_mtimes() != self._mtimes
+
+    def _read_mtimes(self):
+        """Returns the modification times of the forecast files, with None for files that do not exist."""
+        mtimes = []
+        for path in self.paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def _refresh_periodically(self, interval):
+        while not self._stop.wait(interval):
+            forecast = self._forecasts.get(self.clock().date())
+            try:
+                if forecast is None or self.clock() - forecast.loaded_at > self.max_age:
+                    self.refresh()
+                elif self._read_mtimes() != self._mtimes:
+                    self.refresh(download=False)
+            except Exception as e:
+                # Leave the cached forecast in place, get will load it itself if it has to
+                print("Forecast refresh failed:", e)
@@ -0,0 +1,126 @@
+import os
+import socket
+import time
+
+# The web application reads the same environment variables to find the worker
+WAKE_HOST = os.environ.get("SCHEDULER_WAKE_HOST", "127.0.0.1")
+WAKE_PORT = int(os.environ.get("SCHEDULER_WAKE_PORT", 50917))
+WAKE_MESSAGE = b"schedule"
+
+
+def notify(host=WAKE_HOST, port=WAKE_PORT):
+    """Wakes a worker waiting in JobQueue.get after a booking has been marked for scheduling. Failing to notify is not
+    an error as the worker still checks the database for bookings on its own, just less often.
+
+    Args:
+        host: The host the worker listens on.
+        port: The UDP port the worker listens on.
+
+    Returns:
+        True if the wake up message was sent, otherwise False.
+    """
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(WAKE_MESSAGE, (host, port))
+        return True
+    except OSError:
+        return False
+
+
+class JobQueue:
+    """Queue of the bookings waiting to be scheduled (the userdata rows with Is_Scheduling set). A booking is claimed
+    by fetching it and acknowledged by the worker writing its result, which clears Is_Scheduling.
+
+    When there is no booking the worker blocks on a local UDP socket instead of polling the database. The web
+    application sends a datagram to the socket (see notify) when it adds a booking, which wakes the worker straight
+    away. As a fallback for missed messages, the worker checks the database again after a timeout that doubles while
+    the queue stays empty, up to max_wait.
+
+    Attributes:
+        database: The SchedulerDatabase to fetch bookings from.
+        min_wait: The shortest time to wait for a wake up message in seconds.
+        max_wait: The longest time to wait for a wake up message in seconds.
+        wait: The time to wait for the next wake up message in seconds.
+        address: The (host, port) tuple the queue listens on.
+    """
+    def __init__(self, database, host=WAKE_HOST, port=WAKE_PORT, min_wait=0.05, max_wait=5.0):
+        self.database = database
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.wait = min_wait
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if port and hasattr(socket, "SO_REUSEPORT"):
+            # Lets every worker of a pool listen on the same port, with each message waking one of them
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self._socket.bind((host, port))
+        self.address = self._socket.getsockname()
+
+    def get(self):
+        """Blocks until a booking is waiting to be scheduled.
+
+        Returns:
+            The SchedulingJob of the booking that has been waiting the longest.
+        """
+        while True:
+            job = self.database.fetch_next_job()
+            if job is not None:
+                self.wait = self.min_wait
+                return job
+
+            self._wait_for_wake_up()
+
+    def get_batch(self, max_jobs, window):
+        """Blocks until a booking is waiting to be scheduled, then collects more bookings for the same charging
+        station with an overlapping preferred period, so that they can be scheduled together. Collecting stops after
+        max_jobs bookings or once window seconds have passed since the first booking was claimed.
+
+        Args:
+            max_jobs: An int as the largest number of bookings to return.
+            window: A float as the longest time to wait for more bookings in seconds.
+
+        Returns:
+            A list of SchedulingJob objects, starting with the booking that has been waiting the longest.
+        """
+        jobs = [self.get()]
+        deadline = time.monotonic() + window
+        first = jobs[0]
+
+        while len(jobs) < max_jobs:
+            jobs.extend(self.database.fetch_jobs(max_jobs - len(jobs), station=first.preferred_station,
+                                                 start=first.preferred_start, end=first.preferred_end,
+                                                 exclude=[job.ev_id for job in jobs]))
+            remaining = deadline - time.monotonic()
+            if len(jobs) >= max_jobs or remaining <= 0:
+                break
+
+            self._wait_for_wake_up(remaining)
+
+        return jobs
+
+    def close(self):
+        """Stops listening for wake up messages."""
+        self._socket.close()
+
+    def _wait_for_wake_up(self, timeout=None):
+        """Waits for a wake up message or for the timeout to pass, whichever comes first. Several wake up messages
+        sent together only cause one database check.
+
+        Args:
+            timeout: The longest time to wait in seconds, or None to wait for the backoff timeout and increase it.
+        """
+        self._socket.settimeout(self.wait if timeout is None else timeout)
+        try:
+            self._socket.recv(64)
+        except socket.timeout:
+            if timeout is None:
+                self.wait = min(self.wait * 2, self.max_wait)
+            return
+
+        self.wait = self.min_wait
+        self._socket.setblocking(False)
+        try:
+            while True:
+                self._socket.recv(64)
+        except OSError:
+            pass
@@ -1,18 +1,59 @@
 """DOcplex Mathematical Programming Reference Manual
 http://ibmdecisionoptimization.github.io/docplex-doc/mp/py-modindex.html
 """
+import json
 import math
+import struct
 
+import numpy as np
 from docplex.mp.model import Model
 from abc import abstractmethod
+from collections import namedtuple
+from dataclasses import dataclass
 from datetime import timedelta, datetime
 from copy import deepcopy
 
 # Constants
 MINS_IN_DAY = 1440
 MINS_IN_HOUR = 60
+DATETIME_DTYPE = "datetime64[us]"
 
+# A single vehicle's charge in a single time slot, where the slot is the datetime of the start of the time slot
+TimetableEntry = namedtuple("TimetableEntry", ["ev_id", "slot", "charge", "charger_id", "arrival", "departure"])
 
+# Binary timetable format: magic, format version, interval length, number of time slots, number of stored entries,
+# number of vehicles, number of schedule statuses and the timetable start (microseconds since the epoch), followed
+# by the timetable's arrays. Every array element is 8 bytes wide, so all arrays stay aligned in the buffer.
+TIMETABLE_MAGIC = b"EVTT"
+TIMETABLE_FORMAT_VERSION = 1
+TIMETABLE_HEADER = struct.Struct("<4sHHqqqqq")
+
+
+def _to_datetime_array(date_times):
+    """Converts a sequence of datetime objects into a NumPy datetime array. Missing values (None) become NaT.
+
+    Args:
+        date_times: A sequence of (timezone naive) datetime objects.
+
+    Returns:
+        A NumPy array of dtype DATETIME_DTYPE.
+    """
+    return np.array(list(date_times), dtype=DATETIME_DTYPE)
+
+
+def _datetimes_to_iso(date_times):
+    """Converts a NumPy datetime array into ISO 8601 strings (to the second). NaT values become None.
+
+    Args:
+        date_times: A NumPy array of dtype DATETIME_DTYPE.
+
+    Returns:
+        A list of ISO 8601 strings or None values.
+    """
+    return np.where(np.isnat(date_times), None, np.datetime_as_string(date_times, unit="s")).tolist()
+
+
+@dataclass
 class ScheduleInfo:
     """Wrapper object to collect information for a single vehicle schedule within a single
     time slot/interval. Multiple ScheduleInfo objects should exist in a single time interval within the timetable
@@ -25,12 +66,13 @@ class ScheduleInfo:
         arrival: The vehicle's scheduled time of arrival in a datetime format.
         departure: The vehicle's scheduled time of departure in a datetime format.
     """
-    def __init__(self, ev_id, charge, charger_id, arrival, departure):
-        self.ev_id = ev_id
-        self.charge = charge
-        self.charger_id = charger_id
-        self.arrival = arrival
-        self.departure = departure
+    __slots__ = ("ev_id", "charge", "charger_id", "arrival", "departure")
+
+    ev_id: int
+    charge: float
+    charger_id: int
+    arrival: datetime
+    departure: datetime
 
     def is_valid(self):
         """Checks if the wrapped values for a vehicle's time interval schedule are valid.
@@ -39,13 +81,74 @@ class ScheduleInfo:
             True if all data items are valid, false if otherwise.
         """
         if self.ev_id < 0 or self.charger_id < 0 \
-                or self.arrival < 0 or self.arrival > MINS_IN_DAY \
-                or self.departure < 0 or self.departure > MINS_IN_DAY:
+                or not isinstance(self.arrival, datetime) \
+                or not isinstance(self.departure, datetime):
             return False
 
         return True
 
 
+class ScheduleBatch:
+    """Array-backed collection of ScheduleInfo records. Each attribute is a NumPy array where the index is the
+    position of the record in the batch, which avoids holding one Python object per vehicle-time interval schedule.
+
+    Attributes:
+        ev_ids: An array of electric vehicle ids.
+        charges: An array of the amount of electricity put into each vehicle in its time interval.
+        charger_ids: An array of the ids of the chargers the vehicles are scheduled into.
+        arrivals: An array of the vehicles' scheduled arrival datetimes.
+        departures: An array of the vehicles' scheduled departure datetimes.
+    """
+    __slots__ = ("ev_ids", "charges", "charger_ids", "arrivals", "departures")
+
+    def __init__(self, ev_ids, charges, charger_ids, arrivals, departures):
+        self.ev_ids = np.asarray(ev_ids, dtype=np.int64)
+        self.charges = np.asarray(charges, dtype=np.float64)
+        self.charger_ids = np.asarray(charger_ids, dtype=np.int64)
+        self.arrivals = np.asarray(arrivals, dtype=DATETIME_DTYPE)
+        self.departures = np.asarray(departures, dtype=DATETIME_DTYPE)
+
+    @classmethod
+    def from_schedules(cls, schedules):
+        """Creates a batch from ScheduleInfo objects.
+
+        Args:
+            schedules: A list of ScheduleInfo objects.
+
+        Returns:
+            A ScheduleBatch holding the same schedule information.
+        """
+        return cls([s.ev_id for s in schedules],
+                   [s.charge for s in schedules],
+                   [s.charger_id for s in schedules],
+                   _to_datetime_array(s.arrival for s in schedules),
+                   _to_datetime_array(s.departure for s in schedules))
+
+    def __len__(self):
+        return len(self.ev_ids)
+
+    def __getitem__(self, i):
+        return ScheduleInfo(int(self.ev_ids[i]),
+                            self.charges[i].item(),
+                            int(self.charger_ids[i]),
+                            self.arrivals[i].item(),
+                            self.departures[i].item())
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def is_valid(self):
+        """Checks if the wrapped values of each schedule in the batch are valid.
+
+        Returns:
+            A boolean array where each element is True if the schedule at that index is valid, false if otherwise.
+        """
+        return (self.ev_ids >= 0) & (self.charger_ids >= 0) \
+            & ~np.isnat(self.arrivals) & ~np.isnat(self.departures)
+
+
+@dataclass(init=False)
 class TimeSlotInfo:
     """Wrapper object to collect information for a single time interval.
 
@@ -59,6 +162,18 @@ class TimeSlotInfo:
                             schedules that are already present in this time interval (i.e., if there are two vehicles
                             scheduled in time interval, there will be two ScheduleInfo objects).
     """
+    __slots__ = ("date_time", "traditional_prod", "renewables_prod", "consumption", "max_capacity",
+                 "available_chargers", "existing_schedules", "price_tariff")
+
+    date_time: datetime
+    traditional_prod: float
+    renewables_prod: float
+    consumption: float
+    max_capacity: float
+    available_chargers: list
+    existing_schedules: list
+    price_tariff: float
+
     def __init__(self, date_time, traditional_prod, consumption, renewables_prod, max_capacity,
                  available_chargers, existing_schedules=None, price_tariff=None):
         self.date_time = date_time
@@ -66,7 +181,8 @@ class TimeSlotInfo:
         self.renewables_prod = renewables_prod
         self.consumption = consumption
         self.max_capacity = max_capacity
-        self.available_chargers = deepcopy(available_chargers)
+        # Charger IDs are immutable integers, so a shallow copy is enough to keep the caller's list untouched
+        self.available_chargers = list(available_chargers)
         self.existing_schedules = [] if not existing_schedules else existing_schedules
         self.price_tariff = 0 if not price_tariff else price_tariff
 
@@ -85,6 +201,84 @@ class TimeSlotInfo:
         return True
 
 
+class TimeSlotBatch:
+    """Array-backed collection of TimeSlotInfo records where the index is the position of the time interval in the
+    batch.
+
+    Attributes:
+        date_times: An array of the time intervals' datetimes.
+        traditional_prod: An array of the total traditional electricity production in each time interval.
+        consumption: An array of the total electricity consumption in each time interval.
+        renewables_prod: An array of the total renewable electricity production in each time interval.
+        max_capacity: An array of the maximum load capacity of the grid in each time interval.
+        price_tariffs: An array of the pricing tariffs of each time interval.
+        available_chargers: A list of lists of charger IDs available in each time interval.
+        existing_schedules: A list of lists of ScheduleInfo objects already present in each time interval.
+    """
+    __slots__ = ("date_times", "traditional_prod", "consumption", "renewables_prod", "max_capacity",
+                 "price_tariffs", "available_chargers", "existing_schedules")
+
+    def __init__(self, date_times, traditional_prod, consumption, renewables_prod, max_capacity,
+                 available_chargers, existing_schedules=None, price_tariffs=None):
+        self.date_times = np.asarray(date_times, dtype=DATETIME_DTYPE)
+        self.traditional_prod = np.asarray(traditional_prod, dtype=np.float64)
+        self.consumption = np.asarray(consumption, dtype=np.float64)
+        self.renewables_prod = np.asarray(renewables_prod, dtype=np.float64)
+        self.max_capacity = np.asarray(max_capacity, dtype=np.float64)
+        self.available_chargers = [list(chargers) for chargers in available_chargers]
+        num_ts = len(self.date_times)
+        self.existing_schedules = existing_schedules if existing_schedules else [[] for ts in range(num_ts)]
+        self.price_tariffs = np.zeros(num_ts) if price_tariffs is None else np.asarray(price_tariffs,
+                                                                                      dtype=np.float64)
+
+    @classmethod
+    def from_timeslots(cls, timeslots):
+        """Creates a batch from TimeSlotInfo objects.
+
+        Args:
+            timeslots: A list of TimeSlotInfo objects.
+
+        Returns:
+            A TimeSlotBatch holding the same time interval information.
+        """
+        return cls(_to_datetime_array(ts.date_time for ts in timeslots),
+                   [ts.traditional_prod for ts in timeslots],
+                   [ts.consumption for ts in timeslots],
+                   [ts.renewables_prod for ts in timeslots],
+                   [ts.max_capacity for ts in timeslots],
+                   [ts.available_chargers for ts in timeslots],
+                   existing_schedules=[ts.existing_schedules for ts in timeslots],
+                   price_tariffs=[ts.price_tariff for ts in timeslots])
+
+    def __len__(self):
+        return len(self.date_times)
+
+    def __getitem__(self, i):
+        return TimeSlotInfo(self.date_times[i].item(),
+                            self.traditional_prod[i].item(),
+                            self.consumption[i].item(),
+                            self.renewables_prod[i].item(),
+                            self.max_capacity[i].item(),
+                            self.available_chargers[i],
+                            existing_schedules=self.existing_schedules[i],
+                            price_tariff=self.price_tariffs[i].item())
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def is_valid(self):
+        """Checks if the wrapped data values of each time slot in the batch are valid.
+
+        Returns:
+            A boolean array where each element is True if the time slot at that index is valid, false if otherwise.
+        """
+        return ~np.isnat(self.date_times) \
+            & (self.traditional_prod >= 0) & (self.renewables_prod >= 0) & (self.consumption >= 0) \
+            & (self.max_capacity >= 0) & (self.price_tariffs >= 0)
+
+
+@dataclass(init=False)
 class VehicleInfo:
     """Wrapper object to collect information for a single electric vehicle to be scheduled.
 
@@ -97,6 +291,15 @@ class VehicleInfo:
         battery_capacity: The battery capacity of the electric vehicle (in kWh).
         charger_id: The charger the vehicle will use to charge.
     """
+    __slots__ = ("id", "time_period", "arrival_soc", "soc_demand", "battery_capacity", "charger_id")
+
+    id: int
+    time_period: tuple
+    arrival_soc: float
+    soc_demand: float
+    battery_capacity: float
+    charger_id: int
+
     def __init__(self, ev_id, time_period, arrival_soc, soc_demand, battery_capacity, charger_id):
         self.id = ev_id
         self.time_period = time_period
@@ -121,22 +324,209 @@ class VehicleInfo:
         return True
 
 
+class VehicleBatch:
+    """Array-backed collection of VehicleInfo records where the index is the position of the vehicle in the batch.
+
+    Attributes:
+        ev_ids: An array of electric vehicle ids.
+        arrivals: An array of the vehicles' arrival datetimes.
+        departures: An array of the vehicles' departure datetimes.
+        arrival_socs: An array of the vehicles' states of charge at arrival.
+        soc_demands: An array of the states of charge to aim for after charging.
+        battery_capacities: An array of the vehicles' battery capacities (in kWh).
+        charger_ids: An array of the chargers the vehicles will use to charge.
+    """
+    __slots__ = ("ev_ids", "arrivals", "departures", "arrival_socs", "soc_demands", "battery_capacities",
+                 "charger_ids")
+
+    def __init__(self, ev_ids, arrivals, departures, arrival_socs, soc_demands, battery_capacities, charger_ids):
+        self.ev_ids = np.asarray(ev_ids, dtype=np.int64)
+        self.arrivals = np.asarray(arrivals, dtype=DATETIME_DTYPE)
+        self.departures = np.asarray(departures, dtype=DATETIME_DTYPE)
+        self.arrival_socs = np.asarray(arrival_socs, dtype=np.float64)
+        self.soc_demands = np.asarray(soc_demands, dtype=np.float64)
+        self.battery_capacities = np.asarray(battery_capacities, dtype=np.float64)
+        self.charger_ids = np.asarray(charger_ids, dtype=np.int64)
+
+    @classmethod
+    def from_vehicles(cls, vehicles):
+        """Creates a batch from VehicleInfo objects.
+
+        Args:
+            vehicles: A list of VehicleInfo objects.
+
+        Returns:
+            A VehicleBatch holding the same vehicle information.
+        """
+        return cls([ev.id for ev in vehicles],
+                   _to_datetime_array(ev.time_period[0] for ev in vehicles),
+                   _to_datetime_array(ev.time_period[1] for ev in vehicles),
+                   [ev.arrival_soc for ev in vehicles],
+                   [ev.soc_demand for ev in vehicles],
+                   [ev.battery_capacity for ev in vehicles],
+                   [ev.charger_id for ev in vehicles])
+
+    def __len__(self):
+        return len(self.ev_ids)
+
+    def __getitem__(self, i):
+        return VehicleInfo(int(self.ev_ids[i]),
+                           (self.arrivals[i].item(), self.departures[i].item()),
+                           self.arrival_socs[i].item(),
+                           self.soc_demands[i].item(),
+                           self.battery_capacities[i].item(),
+                           int(self.charger_ids[i]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def is_valid(self):
+        """Checks if the wrapped data values of each vehicle in the batch are valid.
+
+        Returns:
+            A boolean array where each element is True if the vehicle at that index is valid, false if otherwise.
+        """
+        return (self.ev_ids >= 0) \
+            & (self.arrival_socs >= 0) & (self.arrival_socs <= 100) \
+            & ~np.isnat(self.arrivals) & ~np.isnat(self.departures) \
+            & (self.battery_capacities >= 0) & (self.charger_ids >= 0)
+
+
 class Timetable:
     """Wrapper object containing schedule information within a time period.
 
+    The charges are stored as a sparse (time slots x vehicles) matrix in compressed sparse row (CSR) format, with
+    side arrays holding the charger, arrival and departure of each vehicle (column). Only the stored entries are
+    kept, so creating a timetable is linear in the number of scheduled vehicle-time interval pairs. The list of
+    lists representation, the per-vehicle summary and the per-charger views are built from the arrays on first access.
+
     Attributes:
-        timetable: A list of lists of ScheduleInfo wrapper objects, representing schedule information for a single
-                   vehicle within a time slot/interval.
+        timetable_start: The datetime of the first time slot/interval in the timetable.
+        schedule_status: A dictionary of the scheduling status for each vehicle that requested scheduling.
+        interval_length: The length of each time slot/interval (in minutes).
+        indptr: An array of num_ts + 1 offsets, where the entries of time slot i are stored at
+                [indptr[i], indptr[i + 1]) in vehicle_indices and charges.
+        vehicle_indices: An array of the vehicle (column) index of each stored entry.
+        charges: An array of the amount of electricity put into the vehicle of each stored entry.
+        ev_ids: An array of the electric vehicle id of each column.
+        charger_ids: An array of the charger id of each column.
+        arrivals: An array of the scheduled arrival datetime of each column.
+        departures: An array of the scheduled departure datetime of each column.
     """
     SCHEDULED_SUCCESSFULLY = 0
     CHARGER_CONFLICT = 1
     SCHEDULE_INFEASIBLE = 2
 
-    def __init__(self, timetable, timetable_start, schedule_status):
-        self.timetable = timetable
+    def __init__(self, timetable_start, schedule_status, indptr, vehicle_indices, charges,
+                 ev_ids, charger_ids, arrivals, departures, interval_length=15):
         self.timetable_start = timetable_start
-        self.schedules = None
         self.schedule_status = schedule_status
+        self.interval_length = interval_length
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.vehicle_indices = np.asarray(vehicle_indices, dtype=np.int64)
+        self.charges = np.asarray(charges, dtype=np.float64)
+        self.ev_ids = np.asarray(ev_ids, dtype=np.int64)
+        self.charger_ids = np.asarray(charger_ids, dtype=np.int64)
+        self.arrivals = np.asarray(arrivals, dtype=DATETIME_DTYPE)
+        self.departures = np.asarray(departures, dtype=DATETIME_DTYPE)
+        self._timetable = None
+        self._schedules = None
+        self._charger_schedules = None
+
+    @classmethod
+    def from_charge_matrix(cls, charge_matrix, entry_mask, ev_ids, charger_ids, arrivals, departures,
+                           timetable_start, schedule_status, interval_length=15):
+        """Creates a timetable from a dense (vehicles x time slots) charge matrix.
+
+        Args:
+            charge_matrix: A matrix of charges where charge_matrix[i][j] is the charge of vehicle i in time slot j.
+            entry_mask: A boolean matrix of the same shape marking which charges are part of the timetable.
+            ev_ids: A list of electric vehicle ids where the index is the row in the charge matrix.
+            charger_ids: A list of charger ids where the index is the row in the charge matrix.
+            arrivals: A list of scheduled arrival datetimes where the index is the row in the charge matrix.
+            departures: A list of scheduled departure datetimes where the index is the row in the charge matrix.
+            timetable_start: The datetime of the first time slot.
+            schedule_status: A dictionary of the scheduling status for each vehicle that requested scheduling.
+            interval_length: The length of each time slot (in minutes).
+
+        Returns:
+            A Timetable holding the masked charges.
+        """
+        num_evs = len(ev_ids)
+        charges = np.asarray(charge_matrix, dtype=np.float64).reshape(num_evs, -1)
+        mask = np.asarray(entry_mask, dtype=bool).reshape(charges.shape)
+        # Non-zero lookup on the transposed matrix orders entries by time slot and then by vehicle
+        ts_indices, ev_indices = np.nonzero(mask.T)
+        indptr = np.zeros(charges.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ts_indices, minlength=charges.shape[1]), out=indptr[1:])
+
+        return cls(timetable_start, schedule_status, indptr, ev_indices, charges[ev_indices, ts_indices],
+                   ev_ids, charger_ids, _to_datetime_array(arrivals), _to_datetime_array(departures),
+                   interval_length=interval_length)
+
+    @classmethod
+    def from_schedule_lists(cls, timetable, timetable_start, schedule_status=None, interval_length=15):
+        """Creates a timetable from a list of lists of ScheduleInfo objects, where the index of the outer list is the
+        time slot. The charger and arrival of each vehicle are taken from its first ScheduleInfo and the departure
+        from its last one.
+
+        Args:
+            timetable: A list of lists of ScheduleInfo objects.
+            timetable_start: The datetime of the first time slot.
+            schedule_status: A dictionary of the scheduling status for each vehicle that requested scheduling.
+            interval_length: The length of each time slot (in minutes).
+
+        Returns:
+            A Timetable holding the same schedule information.
+        """
+        columns = dict()
+        ev_ids, charger_ids, arrivals, departures = [], [], [], []
+        indptr, vehicle_indices, charges = [0], [], []
+
+        for ts in timetable:
+            for s in ts:
+                if s.ev_id not in columns:
+                    columns[s.ev_id] = len(ev_ids)
+                    ev_ids.append(s.ev_id)
+                    charger_ids.append(s.charger_id)
+                    arrivals.append(s.arrival)
+                    departures.append(s.departure)
+                departures[columns[s.ev_id]] = s.departure
+                vehicle_indices.append(columns[s.ev_id])
+                charges.append(s.charge)
+            indptr.append(len(vehicle_indices))
+
+        return cls(timetable_start, dict() if schedule_status is None else schedule_status,
+                   indptr, vehicle_indices, charges, ev_ids, charger_ids,
+                   _to_datetime_array(arrivals), _to_datetime_array(departures),
+                   interval_length=interval_length)
+
+    @property
+    def num_timeslots(self):
+        """The number of time slots in the timetable."""
+        return len(self.indptr) - 1
+
+    @property
+    def timetable(self):
+        """A list of lists of ScheduleInfo wrapper objects, representing schedule information for a single vehicle
+        within a time slot/interval. Built on first access.
+        """
+        if self._timetable is None:
+            self._timetable = self._build_schedule_lists(np.ones(len(self.vehicle_indices), dtype=bool))
+
+        return self._timetable
+
+    def get_charge_matrix(self):
+        """Returns the charges as a dense matrix.
+
+        Returns:
+            A NumPy (time slots x vehicles) array where the column index matches the side arrays (e.g. ev_ids).
+        """
+        charge_matrix = np.zeros((self.num_timeslots, len(self.ev_ids)))
+        charge_matrix[self._get_entry_timeslots(), self.vehicle_indices] = self.charges
+
+        return charge_matrix
 
     def get_schedules(self):
         """Returns a compact representation of the schedule in the timetable.
@@ -145,23 +535,38 @@ class Timetable:
             A dictionary representation of the scheduled charging times in the format:
             {ev_id: {'arrival': arrival_datetime, 'departure': departure_datetime, 'charge': total_schedule_charge}}
         """
-        if not self.schedules:
+        if self._schedules is None:
             ev_schedules = dict()
+            ev_total_charges = np.bincount(self.vehicle_indices, weights=self.charges, minlength=len(self.ev_ids))
+            ev_indices, first_entries = np.unique(self.vehicle_indices, return_index=True)
+
+            # Add vehicles in the order they first appear in the timetable
+            for ev_i in ev_indices[np.argsort(first_entries, kind="stable")]:
+                ev_id = int(self.ev_ids[ev_i])
+                if ev_id not in ev_schedules:
+                    ev_schedules[ev_id] = dict()
+                    ev_schedules[ev_id]["arrival"] = self.arrivals[ev_i].item()
+                    ev_schedules[ev_id]["charge"] = 0
+                ev_schedules[ev_id]["departure"] = self.departures[ev_i].item()
+                ev_schedules[ev_id]["charge"] += ev_total_charges[ev_i].item()
+
+            self._schedules = ev_schedules
+
+        return self._schedules
 
-            # Go through the timetable, for each time a new vehicle is encountered, add it and its arrival to the
-            # dictionary. If it's already in the dictionary, update the departure.
-            for ts in self.timetable:
-                for s in ts:
-                    if s.ev_id not in ev_schedules:
-                        ev_schedules[s.ev_id] = dict()
-                        ev_schedules[s.ev_id]["arrival"] = s.arrival
-                        ev_schedules[s.ev_id]["charge"] = 0
-                    ev_schedules[s.ev_id]["departure"] = s.departure
-                    ev_schedules[s.ev_id]["charge"] += s.charge
+    def get_charger_schedules(self):
+        """Returns the timetable split by charger.
 
-            self.schedules = ev_schedules
+        Returns:
+            A dictionary in the format {charger_id: timetable} where each timetable is a list of lists of ScheduleInfo
+            objects containing only the vehicles using that charger.
+        """
+        if self._charger_schedules is None:
+            entry_chargers = self.charger_ids[self.vehicle_indices]
+            self._charger_schedules = {int(charger_id): self._build_schedule_lists(entry_chargers == charger_id)
+                                       for charger_id in np.unique(entry_chargers)}
 
-        return self.schedules
+        return self._charger_schedules
 
     def get_schedule_status(self):
         """Returns a compact representation of the status of each scheduling attempt.
@@ -171,6 +576,189 @@ class Timetable:
         """
         return self.schedule_status
 
+    def get_entries(self):
+        """Returns every stored vehicle-time slot charge in the timetable.
+
+        Returns:
+            A list of TimetableEntry tuples ordered by time slot.
+        """
+        slots = np.datetime64(self.timetable_start, "us") \
+            + self._get_entry_timeslots() * np.timedelta64(self.interval_length, "m")
+        vehicle_indices = self.vehicle_indices
+
+        return list(map(TimetableEntry,
+                        self.ev_ids[vehicle_indices].tolist(),
+                        slots.tolist(),
+                        self.charges.tolist(),
+                        self.charger_ids[vehicle_indices].tolist(),
+                        self.arrivals[vehicle_indices].tolist(),
+                        self.departures[vehicle_indices].tolist()))
+
+    def diff(self, previous, tolerance=1e-6):
+        """Compares the timetable against a previous timetable of the same vehicles. Entries are matched on the
+        vehicle id and the datetime of the time slot, so the two timetables do not need to start at the same time.
+
+        Args:
+            previous: The previous Timetable, or None if there was no previous timetable.
+            tolerance: The largest difference in charge for two matched entries to still be considered the same.
+
+        Returns:
+            A dictionary of lists of TimetableEntry tuples in the format
+            {'inserted': [...], 'updated': [...], 'removed': [...]}, where inserted and updated entries are taken from
+            this timetable and removed entries are taken from the previous timetable.
+        """
+        current_entries = {(entry.ev_id, entry.slot): entry for entry in self.get_entries()}
+        previous_entries = {(entry.ev_id, entry.slot): entry for entry in previous.get_entries()} \
+            if previous is not None else dict()
+
+        inserted, updated = [], []
+        for key, entry in current_entries.items():
+            previous_entry = previous_entries.get(key)
+            if previous_entry is None:
+                inserted.append(entry)
+            elif abs(entry.charge - previous_entry.charge) > tolerance \
+                    or entry.charger_id != previous_entry.charger_id \
+                    or entry.arrival != previous_entry.arrival \
+                    or entry.departure != previous_entry.departure:
+                updated.append(entry)
+        removed = [entry for key, entry in previous_entries.items() if key not in current_entries]
+
+        return {"inserted": inserted, "updated": updated, "removed": removed}
+
+    def to_bytes(self):
+        """Serialises the timetable into the versioned binary timetable format.
+
+        Returns:
+            A bytes object containing the header followed by the raw NumPy array buffers.
+        """
+        status_ev_indices = np.fromiter(self.schedule_status.keys(), dtype=np.int64, count=len(self.schedule_status))
+        statuses = np.fromiter(self.schedule_status.values(), dtype=np.int64, count=len(self.schedule_status))
+        header = TIMETABLE_HEADER.pack(TIMETABLE_MAGIC,
+                                       TIMETABLE_FORMAT_VERSION,
+                                       self.interval_length,
+                                       self.num_timeslots,
+                                       len(self.vehicle_indices),
+                                       len(self.ev_ids),
+                                       len(statuses),
+                                       int(np.datetime64(self.timetable_start, "us").astype(np.int64)))
+
+        return b"".join([header]
+                        + [np.ascontiguousarray(array).tobytes()
+                           for array in (self.indptr, self.vehicle_indices, self.charges,
+                                         self.ev_ids, self.charger_ids, self.arrivals, self.departures,
+                                         status_ev_indices, statuses)])
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """Loads a timetable from the versioned binary timetable format. The timetable's arrays are read-only views
+        into the given buffer, so no array data is copied.
+
+        Args:
+            buffer: A bytes-like object created by Timetable.to_bytes().
+
+        Returns:
+            The deserialised Timetable.
+
+        Raises:
+            ValueError: If the buffer is not a timetable or was written with an unsupported format version.
+        """
+        if len(buffer) < TIMETABLE_HEADER.size:
+            raise ValueError("Buffer is too small to contain a timetable")
+        magic, version, interval_length, num_ts, num_entries, num_evs, num_statuses, start = \
+            TIMETABLE_HEADER.unpack_from(buffer)
+        if magic != TIMETABLE_MAGIC:
+            raise ValueError("Buffer does not contain a timetable")
+        if version != TIMETABLE_FORMAT_VERSION:
+            raise ValueError("Unsupported timetable format version: {}".format(version))
+
+        arrays = []
+        offset = TIMETABLE_HEADER.size
+        for dtype, count in ((np.int64, num_ts + 1), (np.int64, num_entries), (np.float64, num_entries),
+                             (np.int64, num_evs), (np.int64, num_evs),
+                             (DATETIME_DTYPE, num_evs), (DATETIME_DTYPE, num_evs),
+                             (np.int64, num_statuses), (np.int64, num_statuses)):
+            arrays.append(np.frombuffer(buffer, dtype=dtype, count=count, offset=offset))
+            offset += arrays[-1].nbytes
+        indptr, vehicle_indices, charges, ev_ids, charger_ids, arrivals, departures, status_ev_indices, statuses \
+            = arrays
+
+        return cls(np.datetime64(start, "us").item(),
+                   dict(zip(status_ev_indices.tolist(), statuses.tolist())),
+                   indptr, vehicle_indices, charges, ev_ids, charger_ids, arrivals, departures,
+                   interval_length=interval_length)
+
+    def iter_json(self):
+        """Encodes the timetable as JSON one time slot at a time, so that large timetables can be streamed (e.g. with
+        a StreamingHttpResponse) without building the whole document in memory.
+
+        Yields:
+            Consecutive chunks of a JSON document in the format
+            {"timetable_start": ..., "interval_length": ..., "schedule_status": {...},
+             "timetable": [[{"ev_id": ..., "charge": ..., "charger_id": ..., "arrival": ..., "departure": ...}]]}
+            where datetimes are ISO 8601 strings.
+        """
+        ev_ids = self.ev_ids.tolist()
+        charger_ids = self.charger_ids.tolist()
+        arrivals = _datetimes_to_iso(self.arrivals)
+        departures = _datetimes_to_iso(self.departures)
+        indptr = self.indptr.tolist()
+        vehicle_indices = self.vehicle_indices.tolist()
+        charges = self.charges.tolist()
+
+        yield '{{"timetable_start": {}, "interval_length": {}, "schedule_status": {}, "timetable": ['.format(
+            json.dumps(self.timetable_start.isoformat()),
+            json.dumps(self.interval_length),
+            json.dumps({str(ev_i): status for ev_i, status in self.schedule_status.items()}))
+        for ts_i in range(self.num_timeslots):
+            yield ("" if ts_i == 0 else ", ") + json.dumps(
+                [{"ev_id": ev_ids[vehicle_indices[i]],
+                  "charge": charges[i],
+                  "charger_id": charger_ids[vehicle_indices[i]],
+                  "arrival": arrivals[vehicle_indices[i]],
+                  "departure": departures[vehicle_indices[i]]}
+                 for i in range(indptr[ts_i], indptr[ts_i + 1])])
+        yield "]}"
+
+    def to_json(self):
+        """Encodes the whole timetable as a JSON string.
+
+        Returns:
+            The JSON document produced by iter_json().
+        """
+        return "".join(self.iter_json())
+
+    def _get_entry_timeslots(self):
+        """Returns the time slot index of each stored entry."""
+        return np.repeat(np.arange(self.num_timeslots), np.diff(self.indptr))
+
+    def _build_schedule_lists(self, entry_mask):
+        """Builds the list of lists representation of the timetable for the selected entries.
+
+        Args:
+            entry_mask: A boolean array marking which stored entries to include.
+
+        Returns:
+            A list of lists of ScheduleInfo objects where the index of the outer list is the time slot.
+        """
+        ev_ids = self.ev_ids.tolist()
+        charger_ids = self.charger_ids.tolist()
+        arrivals = self.arrivals.tolist()
+        departures = self.departures.tolist()
+        vehicle_indices = self.vehicle_indices.tolist()
+        charges = self.charges.tolist()
+        include = entry_mask.tolist()
+
+        timetable = []
+        for ts_i in range(self.num_timeslots):
+            timetable.append([ScheduleInfo(ev_ids[vehicle_indices[i]],
+                                           charges[i],
+                                           charger_ids[vehicle_indices[i]],
+                                           arrivals[vehicle_indices[i]],
+                                           departures[vehicle_indices[i]])
+                              for i in range(self.indptr[ts_i], self.indptr[ts_i + 1]) if include[i]])
+
+        return timetable
+
 
 class LPScheduler:
     """Advance scheduler implementation that models the problem as a mathematical mixed-integer linear programming
@@ -452,7 +1040,7 @@ class LPScheduler:
     def _create_timetable(self, charge_matrix, ts_allocations, new_time_period_schedule, offset,
                           ev_info, scheduled_ev_ts_allocations, scheduled_ev_charge_matrix,
                           scheduled_ev_info, scheduled_evs):
-        """Creates a matrix of ScheduleInfo objects that represent charge allocations.
+        """Creates a sparse Timetable of the charge allocations of both the newly and the already scheduled vehicles.
 
         Args:
             charge_matrix: A matrix representing how much charge is put into each interval for each vehicle.
@@ -463,45 +1051,37 @@ class LPScheduler:
             A Timetable representing all the electric vehicle charging schedules (arrival and departure times are based
             on the first and last charge allocation of each vehicle in the charge matrix).
         """
-        num_evs, num_ts, num_scheduled_evs = len(charge_matrix), len(charge_matrix[0]), len(scheduled_evs)
-        schedule_status = dict()
-        timetable = [[] for ts in range(num_ts)]
-
-        for ts_i in range(num_ts):
-            for ev_i in range(num_evs):
-                if charge_matrix[ev_i][ts_i] > 0:
-                    arrival = new_time_period_schedule[ev_i]["arrival"]
-                    departure = new_time_period_schedule[ev_i]["departure"]
-                    ts_schedule = ScheduleInfo(ev_info[ev_i].id,
-                                               charge_matrix[ev_i][ts_i],
-                                               ev_info[ev_i].charger_id,
-                                               arrival,
-                                               departure)
-                    timetable[ts_i].append(ts_schedule)
-
-        # Add status of vehicles that requested to schedule
-        for ev_i in range(num_evs):
-            if all(ev_charge_row == 0 for ev_charge_row in charge_matrix[ev_i]):
-                if all(ts_allocation_row == 0 for ts_allocation_row in ts_allocations[ev_i]):
-                    schedule_status[ev_i] = Timetable.CHARGER_CONFLICT
-                else:
-                    schedule_status[ev_i] = Timetable.SCHEDULE_INFEASIBLE
-            else:
-                schedule_status[ev_i] = Timetable.SCHEDULED_SUCCESSFULLY
-
-        for ts_i in range(num_ts):  # Add existing vehicles
-            for ev_i in range(len(scheduled_evs)):
-                if scheduled_ev_ts_allocations[ev_i][ts_i] > 0:
-                    arrival = scheduled_evs[scheduled_ev_info["ev_ids"][ev_i]].time_period[0]
-                    departure = scheduled_evs[scheduled_ev_info["ev_ids"][ev_i]].time_period[1]
-                    ts_schedule = ScheduleInfo(scheduled_ev_info["ev_ids"][ev_i],
-                                               scheduled_ev_charge_matrix[ev_i][ts_i],
-                                               scheduled_ev_info["charger_ids"][ev_i],
-                                               arrival,
-                                               departure)
-                    timetable[ts_i].append(ts_schedule)
-
-        return Timetable(timetable, offset, schedule_status)
+        num_evs, num_scheduled_evs = len(ev_info), len(scheduled_evs)
+        new_charges = np.asarray(charge_matrix, dtype=np.float64).reshape(num_evs, -1)
+        num_ts = new_charges.shape[1]
+
+        # Status of vehicles that requested to schedule: any charge means success, otherwise a vehicle that was not
+        # allocated a single time slot lost its charger to another vehicle
+        has_charge = (new_charges != 0).any(axis=1)
+        has_allocation = (np.asarray(ts_allocations).reshape(num_evs, num_ts) != 0).any(axis=1)
+        statuses = np.where(has_charge,
+                            Timetable.SCHEDULED_SUCCESSFULLY,
+                            np.where(has_allocation, Timetable.SCHEDULE_INFEASIBLE, Timetable.CHARGER_CONFLICT))
+        schedule_status = dict(enumerate(statuses.tolist()))
+
+        # Vehicles that requested scheduling are included where they receive charge, whilst existing vehicles are
+        # included in every time slot allocated to them
+        scheduled_charges = np.asarray(scheduled_ev_charge_matrix, dtype=np.float64).reshape(num_scheduled_evs, num_ts)
+        scheduled_allocations = np.asarray(scheduled_ev_ts_allocations).reshape(num_scheduled_evs, num_ts)
+        scheduled_ev_ids = scheduled_ev_info["ev_ids"]
+
+        return Timetable.from_charge_matrix(
+            np.vstack((new_charges, scheduled_charges)),
+            np.vstack((new_charges > 0, scheduled_allocations > 0)),
+            [ev.id for ev in ev_info] + scheduled_ev_ids,
+            [ev.charger_id for ev in ev_info] + scheduled_ev_info["charger_ids"],
+            np.concatenate((new_time_period_schedule["arrival"],
+                            _to_datetime_array(scheduled_evs[ev_id].time_period[0] for ev_id in scheduled_ev_ids))),
+            np.concatenate((new_time_period_schedule["departure"],
+                            _to_datetime_array(scheduled_evs[ev_id].time_period[1] for ev_id in scheduled_ev_ids))),
+            offset,
+            schedule_status,
+            interval_length=self.interval_length)
 
     def _get_first_and_last_interval(self, ts_info):
         """Obtains the first and last interval of the scheduling window.
@@ -543,31 +1123,31 @@ class LPScheduler:
             last_interval: The last time interval in the scheduling window in a datetime format.
 
         Returns:
-            A list of dictionaries representing a new schedule for each vehicle based on their first and last charge
-            allocation in the charge matrix. Each dictionary index corresponds to a vehicle's local scheduling ID.
+            A dictionary of arrays in the format {'arrival': arrival_datetimes, 'departure': departure_datetimes}
+            representing a new schedule for each vehicle based on their first and last charge allocation in the charge
+            matrix. Each array index corresponds to a vehicle's local scheduling ID. Vehicles without a charge
+            allocation have NaT as their arrival and departure.
         """
-        num_evs, num_ts = len(charge_matrix), len(charge_matrix[0])
-        new_time_period = []
-
-        for ev_i in range(num_evs):
-            new_time_period.append(dict())
-            # Find the time vehicle first starts charging
-            curr_time = first_interval
-            for ts_i in range(num_ts):
-                if charge_matrix[ev_i][ts_i] > 0:
-                    new_time_period[ev_i]["arrival"] = curr_time
-                    break
-                curr_time += timedelta(minutes=15)
-
-            # Find the time vehicle reaches demand or stops charging
-            curr_time = last_interval
-            for ts_i in range(num_ts - 1, 0, -1):
-                if charge_matrix[ev_i][ts_i-1] > 0:
-                    new_time_period[ev_i]["departure"] = curr_time
-                    break
-                curr_time -= timedelta(minutes=15)
-
-        return new_time_period
+        charging = np.asarray(charge_matrix, dtype=np.float64).reshape(len(charge_matrix), -1) > 0
+        num_ts = charging.shape[1]
+        interval = np.timedelta64(self.interval_length, "m")
+        not_a_time = np.datetime64("NaT", "us")
+
+        # The time vehicle first starts charging is the first time interval with a charge
+        first_charge_ts = np.argmax(charging, axis=1)
+        arrivals = np.where(charging.any(axis=1),
+                            np.datetime64(first_interval, "us") + first_charge_ts * interval,
+                            not_a_time)
+
+        # The time vehicle reaches demand or stops charging is the end of the last time interval with a charge. The
+        # last time interval only marks the end of the window, so a charge in it is not considered.
+        charging_before_last = charging[:, :max(num_ts - 1, 0)]
+        ts_after_last_charge = np.argmax(charging_before_last[:, ::-1], axis=1)
+        departures = np.where(charging_before_last.any(axis=1),
+                              np.datetime64(last_interval, "us") - ts_after_last_charge * interval,
+                              not_a_time)
+
+        return {"arrival": arrivals, "departure": departures}
 
     def _add_existing_charges_to_consumption(self, timeslots, consumption):
         """Adds existing schedules' charge values as consumption to each time interval.
@@ -1,284 +1,443 @@
-from datetime import datetime, timedelta
+import argparse
+import multiprocessing
+import socket
+from contextlib import ExitStack
+from datetime import timedelta
 
-import mysql.connector
 from dateutil.relativedelta import relativedelta
 
 from scheduler.lp_scheduler import LPScheduler, VehicleInfo, TimeSlotInfo, \
-    ScheduleInfo
-
-from generators.simple_api_request import BMRSAPIRequest
-from generators.parse_csv import APIResultParser
-from generators.local_consumption_generator import ConsumptionTariffGenerator
-
-db = mysql.connector.connect(
-    host="schedulerdb.cv1vtvg9bql2.eu-west-2.rds.amazonaws.com", user="admin",
-    passwd="password", database="Scheduler")
-cursor = db.cursor()
-
-newStart = datetime.now()
-newEnd = datetime.now()
-isClashing = 0
-clashed = False
-
-while 1:
-
-    db.commit()
-    cursor.execute("SELECT id FROM userdata WHERE Is_Scheduling = 1 limit 1")
-    results = cursor.fetchall()
-    row_count = cursor.rowcount
-
-    if row_count != 0:
-
-        cursor.execute(
-            "SELECT id FROM userdata WHERE Is_Scheduling = 1 ORDER BY Arrival limit 1")
-        results = cursor.fetchall()
-        evID = results[0]
-        evID = int(''.join(map(str, evID)))
-
-        cursor.execute(
-            "SELECT Current_Charge FROM userdata WHERE Is_Scheduling = 1 ORDER BY Arrival limit 1")
-        results = cursor.fetchall()
-        currentCharge = results[0]
-        currentCharge = int(''.join(map(str, currentCharge)))
-
-        cursor.execute(
-            "SELECT Preferred_Start_Datetime FROM userdata WHERE Is_Scheduling = 1 ORDER BY Arrival limit 1")
-        results = cursor.fetchall()
-        prefStart = results[0]
-        prefStart = str(''.join(map(str, prefStart)))
-
-        cursor.execute(
-            "SELECT Preferred_End_Datetime FROM userdata WHERE Is_Scheduling = 1 ORDER BY Arrival limit 1")
-        results = cursor.fetchall()
-        prefEnd = results[0]
-        prefEnd = str(''.join(map(str, prefEnd)))
-
-        cursor.execute(
-            "SELECT Preferred_Charge_Level FROM userdata WHERE Is_Scheduling = 1 ORDER BY Arrival limit 1")
-        results = cursor.fetchall()
-        prefCharge = results[0]
-        prefCharge = int(''.join(map(str, prefCharge)))
-
-        cursor.execute(
-            "SELECT Preferred_Charge_Station FROM userdata WHERE Is_Scheduling = 1 ORDER BY Arrival limit 1")
-        results = cursor.fetchall()
-        prefStation = results[0]
-        prefStation = int(''.join(map(str, prefStation)))
-
-        cursor.execute(
-            "SELECT Car FROM userdata WHERE Is_Scheduling = 1 ORDER BY Arrival limit 1")
-        results = cursor.fetchall()
-
-        car = results[0]
-
-        cursor.execute(
-            "SELECT Battery_Capacity FROM cardata WHERE Car_Model = %s", car)
-        results = cursor.fetchall()
-        batteryCap = results[0]
-        batteryCap = int(''.join(map(str, batteryCap)))
-
-        scheduler = LPScheduler(["producers"], ["consumers"],
-                                ["renewable producers"], [50, 50])
-
-        prefStart = datetime.strptime(prefStart, '%Y-%m-%d %H:%M:%S')
-        prefEnd = datetime.strptime(prefEnd, '%Y-%m-%d %H:%M:%S')
-
-        if isClashing != 0:
-            prefStart = newStart
-            prefEnd = newEnd
-
-        prefEnd = prefEnd + relativedelta(minutes=15)
-
-        duration = prefEnd - prefStart
-        minutes = duration.total_seconds() / 60
-        numOfTimeslots = int(
-            LPScheduler.discretise_time(scheduler, minutes) / 15)
-
-        timeslotList = []
-
-        BMRSAPIRequest()
-
-        tweakedStation = prefStation
-
-        if tweakedStation == 2:
-            tweakedStation = 0
-
-        parser = APIResultParser()
-        parser2 = ConsumptionTariffGenerator()
-        renewable_production = parser.renewable48
-        consumption = parser2.data_array
-        traditional_production = parser.quantity_array_now
-
-        for i in range(numOfTimeslots):
-
-            scheduleInfoList = []
-            start = prefStart + timedelta(minutes=15 * i)
-
-            db.commit()
-            sql25 = "SELECT idEV FROM userTimes WHERE Timeslots = %s AND idEV <> %s"
-            adr25 = (start, evID)
-            cursor.execute(sql25, adr25)
-            results = cursor.fetchall()
-            row_count1 = cursor.rowcount
-
-            if row_count1 != 0:
-
-                sql20 = "SELECT idEV FROM userTimes WHERE Timeslots = %s AND idEV <> %s"
-                adr20 = (start, evID)
-                cursor.execute(sql20, adr20)
-                results1 = cursor.fetchall()
-                idList = list(results1)
-
-                sql21 = "SELECT chargeInSlot FROM userTimes WHERE Timeslots = %s AND idEV <> %s"
-                adr21 = (start, evID)
-                cursor.execute(sql21, adr21)
-                results2 = cursor.fetchall()
-
-                sql22 = "SELECT chargerID FROM userTimes WHERE Timeslots = %s AND idEV <> %s"
-                adr22 = (start, evID)
-                cursor.execute(sql22, adr22)
-                results3 = cursor.fetchall()
-
-                sql23 = "SELECT ArrivalTime FROM userTimes WHERE Timeslots = %s AND idEV <> %s"
-                adr23 = (start, evID)
-                cursor.execute(sql23, adr23)
-                results4 = cursor.fetchall()
-
-                sql24 = "SELECT EndTime FROM userTimes WHERE Timeslots = %s AND idEV <> %s"
-                adr24 = (start, evID)
-                cursor.execute(sql24, adr24)
-                results5 = cursor.fetchall()
-
-                for x in range(len(idList)):
-                    station = int(''.join(map(str, results3[x])))
-
-                    if station == 2:
-                        station = 0
-
-                    scheduleInfoList.append(
-                        ScheduleInfo(ev_id=int(''.join(map(str, results1[x]))),
-                                     charge=int(''.join(map(str, results2[x]))),
-                                     charger_id=station,
-                                     arrival=datetime.strptime(
-                                         str(''.join(map(str, results4[x]))),
-                                         '%Y-%m-%d %H:%M:%S'),
-                                     departure=datetime.strptime(
-                                         str(''.join(map(str, results5[x]))),
-                                         '%Y-%m-%d %H:%M:%S')))
-                timeslotList.append(
-                    TimeSlotInfo(
-                        date_time=prefStart + timedelta(minutes=15 * i),
-                        traditional_prod=traditional_production[i],
-                        consumption=consumption[i],
-                        renewables_prod=renewable_production[i],
-                        max_capacity=1000,
-                        available_chargers=[tweakedStation],
-                        existing_schedules=scheduleInfoList))
-
-            else:
-                timeslotList.append(
-                    TimeSlotInfo(
-                        date_time=prefStart + timedelta(minutes=15 * i),
-                        traditional_prod=traditional_production[i],
-                        consumption=consumption[i],
-                        renewables_prod=renewable_production[i],
-                        max_capacity=1000,
-                        available_chargers=[tweakedStation],
-                        existing_schedules=None))
-
-        s = scheduler.schedule(
+    Timetable
+from database.connection_pool import CONNECTION_ERRORS
+from scheduler.scheduler_db import SchedulerDatabase, BookingResult
+from scheduler.booking_index import BookingIndex
+from scheduler.job_queue import JobQueue
+from scheduler.forecast_cache import ForecastCache
+from scheduler.solver_process import SolverProcess, SolveTimeout
+
+SCHEDULER_ARGS = (["producers"], ["consumers"], ["renewable producers"],
+                  [50, 50])
+MAX_SOLVE_ATTEMPTS = 3
+RETRY_DELAY = 60
+MAX_FLEET_SIZE = 250
+MAX_CAPACITY = 1000
+
+
+def publish_forecast(forecast):
+    """Stores a newly loaded forecast for the web application's utilisation
+    report. Runs on the forecast cache's thread, so it uses a connection of
+    its own.
+
+    Args:
+        forecast: The Forecast that was loaded.
+    """
+    database = SchedulerDatabase()
+    try:
+        database.save_forecast(forecast, MAX_CAPACITY)
+    finally:
+        database.close()
+
+
+def count_timeslots(scheduler, start, end):
+    """Returns the number of time slots of a scheduling window, plus the time
+    slot marking the end of the window, so that a booking is given the same
+    window whether it is scheduled alone or in a batch.
+
+    Args:
+        scheduler: An LPScheduler object.
+        start: A datetime object as the start of the window.
+        end: A datetime object as the end of the window.
+
+    Returns:
+        An int as the number of time slots.
+    """
+    minutes = (end - start).total_seconds() / 60
+    return int(LPScheduler.discretise_time(scheduler, minutes) / 15) + 1
+
+
+def schedule_batch(database, bookings, forecast, jobs, solver):
+    """Schedules several bookings together in a single solve, and writes the
+    results of the bookings that were scheduled without clashing with another
+    booking.
+
+    Args:
+        database: The SchedulerDatabase the bookings were claimed from.
+        bookings: The BookingIndex of the committed bookings.
+        forecast: The Forecast of the current settlement date.
+        jobs: A list of SchedulingJob objects.
+        solver: The SolverProcess to solve with.
+
+    Returns:
+        A list of the SchedulingJob objects that were not scheduled and have
+        to be scheduled one at a time instead.
+    """
+    for job in jobs:
+        if job.battery_capacity is None:
+            # The car model of the booking has no entry in cardata
+            database.mark_failed(job.ev_id)
+    jobs = [job for job in jobs if job.battery_capacity is not None]
+    if not jobs:
+        return []
+
+    scheduler = LPScheduler(*SCHEDULER_ARGS)
+    stations = sorted({job.preferred_station for job in jobs})
+    vehicles = [VehicleInfo(ev_id=job.ev_id,
+                            time_period=(job.preferred_start,
+                                         job.preferred_end
+                                         + relativedelta(minutes=15)),
+                            arrival_soc=job.current_charge,
+                            soc_demand=job.preferred_charge,
+                            battery_capacity=job.battery_capacity,
+                            charger_id=job.charger_id)
+                for job in jobs]
+
+    # The time slots cover the preferred periods of all the bookings
+    start = min(vehicle.time_period[0] for vehicle in vehicles)
+    end = max(vehicle.time_period[1] for vehicle in vehicles)
+    numOfTimeslots = count_timeslots(scheduler, start, end)
+    if numOfTimeslots > len(forecast.consumption):
+        # The forecast only covers one day
+        return jobs
+
+    database.commit()
+    existingSchedules = database.fetch_existing_schedules(
+        start, numOfTimeslots, [job.ev_id for job in jobs])
+    timeslotList = [
+        TimeSlotInfo(date_time=start + timedelta(minutes=15 * i),
+                     traditional_prod=forecast.traditional_production[i],
+                     consumption=forecast.consumption[i],
+                     renewables_prod=forecast.renewable_production[i],
+                     max_capacity=MAX_CAPACITY,
+                     available_chargers=sorted(
+                         {job.charger_id for job in jobs}),
+                     existing_schedules=existingSchedules[i])
+        for i in range(numOfTimeslots)]
+    previousTimetable = Timetable.from_schedule_lists(
+        [timeslot.existing_schedules for timeslot in timeslotList], start)
+
+    try:
+        s = solver.solve(SCHEDULER_ARGS, vehicles, timeslotList)
+    except (SolveTimeout, RuntimeError):
+        # Smaller problems are solved faster, and a failing booking only
+        # fails on its own, so fall back to scheduling the bookings one at a
+        # time
+        return jobs
+    if s is None:
+        return jobs
+
+    schedules = s.get_schedules()
+    leftovers = [job for job in jobs if job.ev_id not in schedules]
+    results = []
+
+    with ExitStack() as locks:
+        # Stations are locked in order, so that workers locking several
+        # stations cannot deadlock
+        for station in stations:
+            locks.enter_context(database.station_lock(station))
+
+        for job in jobs:
+            if job.ev_id not in schedules:
+                continue
+
+            station = job.preferred_station
+            startCharge = schedules[job.ev_id]["arrival"]
+            endCharge = schedules[job.ev_id]["departure"]
+            clashesInBatch = any(result.station == station
+                                 and result.start < endCharge
+                                 and result.end > startCharge
+                                 for result in results)
+            if clashesInBatch or bookings.station(station).find_clash(
+                    startCharge, endCharge, job.ev_id) is not None:
+                # Scheduled one at a time, the booking gets a suggested
+                # period instead
+                leftovers.append(job)
+                continue
+
+            finalCharge = schedules[job.ev_id]["charge"]
+            results.append(BookingResult(
+                job.ev_id, startCharge, endCharge, station,
+                (finalCharge / job.battery_capacity) * 100))
+
+        if results:
+            skipped = {job.ev_id for job in leftovers}
+            changes = {kind: [entry for entry in entries
+                              if entry.ev_id not in skipped]
+                       for kind, entries in
+                       s.diff(previousTimetable).items()}
+            database.save_schedules(results, changes)
+            bookings.record(results)
+
+    return leftovers
+
+
+def schedule_job(database, bookings, forecast, job, solver, solve_attempts):
+    """Schedules a single booking and writes its result: its schedule, a
+    suggested period when the schedule clashes with another booking, or a
+    failure.
+
+    Args:
+        database: The SchedulerDatabase the booking was claimed from.
+        bookings: The BookingIndex of the committed bookings.
+        forecast: The Forecast of the current settlement date.
+        job: The SchedulingJob of the booking.
+        solver: The SolverProcess to solve with.
+        solve_attempts: A dictionary of vehicle IDs to the number of their
+            solves that timed out or failed, kept between calls.
+    """
+    evID = job.ev_id
+    currentCharge = job.current_charge
+    prefStart = job.preferred_start
+    prefEnd = job.preferred_end
+    prefCharge = job.preferred_charge
+    prefStation = job.preferred_station
+    batteryCap = job.battery_capacity
+
+    if batteryCap is None:
+        # The car model of the booking has no entry in cardata
+        database.mark_failed(evID)
+        return
+
+    scheduler = LPScheduler(*SCHEDULER_ARGS)
+
+    prefEnd = prefEnd + relativedelta(minutes=15)
+    numOfTimeslots = count_timeslots(scheduler, prefStart, prefEnd)
+
+    timeslotList = []
+
+    tweakedStation = job.charger_id
+
+    if numOfTimeslots > len(forecast.consumption):
+        # The forecast only covers one day
+        database.mark_failed(evID)
+        return
+    renewable_production = forecast.renewable_production
+    consumption = forecast.consumption
+    traditional_production = forecast.traditional_production
+
+    database.commit()
+    existingSchedules = database.fetch_existing_schedules(
+        prefStart, numOfTimeslots, evID)
+
+    for i in range(numOfTimeslots):
+        timeslotList.append(
+            TimeSlotInfo(
+                date_time=prefStart + timedelta(minutes=15 * i),
+                traditional_prod=traditional_production[i],
+                consumption=consumption[i],
+                renewables_prod=renewable_production[i],
+                max_capacity=MAX_CAPACITY,
+                available_chargers=[tweakedStation],
+                existing_schedules=existingSchedules[i]))
+
+    # Bookings of the other vehicles as they are stored now, so that only
+    # the rows the new schedule changes have to be written back
+    previousTimetable = Timetable.from_schedule_lists(
+        [timeslot.existing_schedules for timeslot in timeslotList],
+        prefStart)
+
+    try:
+        s = solver.solve(
+            SCHEDULER_ARGS,
             [VehicleInfo(ev_id=evID, time_period=(prefStart, prefEnd),
                          arrival_soc=currentCharge, soc_demand=prefCharge,
                          battery_capacity=batteryCap,
                          charger_id=tweakedStation)], timeslotList)
-        if evID not in s.get_schedules().keys():
-            sql6 = "UPDATE userdata SET Error = %s WHERE id = %s"
-            adr6 = ("1", evID)
-            cursor.execute(sql6, adr6)
-            sql11 = "UPDATE userdata SET Is_Scheduling = %s WHERE id = %s"
-            adr11 = ("0", evID)
-            cursor.execute(sql11, adr11)
-
+    except (SolveTimeout, RuntimeError):
+        # The solve went over the time limit, or failed or crashed its
+        # process. Either way the worker carries on with other bookings
+        solve_attempts[evID] = solve_attempts.get(evID, 0) + 1
+        if solve_attempts[evID] >= MAX_SOLVE_ATTEMPTS:
+            del solve_attempts[evID]
+            database.mark_failed(evID)
         else:
+            # Let the worker move on to other bookings in the meantime
+            database.defer_job(evID, RETRY_DELAY)
+        return
+
+    solve_attempts.pop(evID, None)
+    if s is None or evID not in s.get_schedules().keys():
+        database.mark_failed(evID)
+
+    else:
+
+        startCharge = s.get_schedules()[evID]["arrival"]
+        endCharge = s.get_schedules()[evID]["departure"]
+        finalCharge = s.get_schedules()[evID]["charge"]
+        finalCharge = (finalCharge / batteryCap) * 100
+
+        # Workers scheduling for the same station check for clashes and
+        # write their schedules one after the other
+        with database.station_lock(prefStation):
+            stationBookings = bookings.station(prefStation)
+            end = stationBookings.find_clash(startCharge, endCharge,
+                                             evID)
+
+            if end is None:
+                result = BookingResult(evID, startCharge, endCharge,
+                                       prefStation, finalCharge)
+                database.save_schedules([result],
+                                        s.diff(previousTimetable))
+                bookings.record([result])
 
-            startCharge = s.get_schedules()[evID]["arrival"]
-            endCharge = s.get_schedules()[evID]["departure"]
-            finalCharge = s.get_schedules()[evID]["charge"]
-            finalCharge = (finalCharge / batteryCap) * 100
-
-            sql = "SELECT Scheduled_Datetime_End FROM userdata WHERE Scheduled_Datetime_Start < %s AND Scheduled_Datetime_End > %s AND Charging_Station = %s AND id <> %s"
-            adr = (endCharge, startCharge, prefStation, evID)
-            cursor.execute(sql, adr)
-            results = cursor.fetchall()
-            isClashing = cursor.rowcount
-
-            if isClashing != 0:
-                end = results[0]
-                end = str(''.join(map(str, end)))
-                end = datetime.strptime(end, '%Y-%m-%d %H:%M:%S')
-                diff = endCharge - startCharge
-                minutes = diff.total_seconds() / 60
-                newStart = end
-                newEnd = end + timedelta(minutes=minutes)
-                clashed = True
-
-            if not clashed:
-                for i in range(numOfTimeslots):
-                    start = prefStart + timedelta(minutes=15 * i)
-                    sql100 = "DELETE FROM userTimes WHERE Timeslots = %s"
-                    adr100 = (start,)
-                    cursor.execute(sql100, adr100)
-                    db.commit()
-
-                sql101 = "DELETE FROM userTimes WHERE idEV = %s"
-                adr101 = (evID,)
-                cursor.execute(sql101, adr101)
-                db.commit()
-
-                currentTime = s.timetable_start
-                for timeslot in s.timetable:
-                    for scheduleInfo in timeslot:
-                        sql16 = "INSERT INTO userTimes(idEV, chargeInSlot, Timeslots, ArrivalTime, EndTime, chargerID) VALUES (%s, %s, %s, %s, %s, %s) "
-                        adr16 = (
-                            scheduleInfo.ev_id, scheduleInfo.charge,
-                            currentTime,
-                            scheduleInfo.arrival, scheduleInfo.departure,
-                            (-scheduleInfo.charger_id) + 1)
-                        cursor.execute(sql16, adr16)
-                        db.commit()
-
-                    currentTime = currentTime + relativedelta(minutes=15)
-
-                sql6 = "UPDATE userdata SET Scheduled_Datetime_Start = %s WHERE id = %s"
-                adr6 = (startCharge, evID)
-                cursor.execute(sql6, adr6)
-                sql7 = "UPDATE userdata SET Scheduled_Datetime_End = %s WHERE id = %s"
-                adr7 = (endCharge, evID)
-                cursor.execute(sql7, adr7)
-                sql8 = "UPDATE userdata SET Charging_Station = %s WHERE id = %s"
-                adr8 = (prefStation, evID)
-                cursor.execute(sql8, adr8)
-                sql9 = "UPDATE userdata SET Final_Charge = %s WHERE id = %s"
-                adr9 = (finalCharge, evID)
-                cursor.execute(sql9, adr9)
-                sql11 = "UPDATE userdata SET Is_Scheduling = %s WHERE id = %s"
-                adr11 = ("0", evID)
-                cursor.execute(sql11, adr11)
-
-            elif isClashing == 0 and clashed:
-
-                sql4 = "UPDATE userdata SET New_Sugg_Start = %s WHERE id = %s"
-                adr4 = (startCharge, evID)
-                cursor.execute(sql4, adr4)
-                sql5 = "UPDATE userdata SET New_Sugg_End = %s WHERE id = %s"
-                adr5 = (endCharge, evID)
-                cursor.execute(sql5, adr5)
-                sql10 = "UPDATE userdata SET Is_Scheduling = %s WHERE id = %s"
-                adr10 = ("0", evID)
-                cursor.execute(sql10, adr10)
-                sql3 = "UPDATE userdata SET Slot_Taken = %s WHERE id = %s"
-                adr3 = ("1", evID)
-                cursor.execute(sql3, adr3)
-                clashed = 0
-
-            db.commit()
+            else:
+                # Suggest the earliest free period of the same length
+                # after the clash, instead of solving again for it
+                newStart, newEnd = stationBookings.find_free_period(
+                    end, endCharge - startCharge, evID)
+                database.save_suggestion(evID, newStart, newEnd)
+
+        database.commit()
+
+
+def claim_jobs(database, queue, batch_size, batch_window):
+    """Blocks until bookings are waiting to be scheduled, then claims the
+    next booking, or the next batch of bookings. Every vehicle of a fleet
+    booking is claimed along with the first one, so that the fleet is
+    scheduled in one solve.
+
+    Args:
+        database: The SchedulerDatabase to claim the bookings from.
+        queue: The JobQueue of the bookings waiting to be scheduled.
+        batch_size: The largest number of bookings for the same charging
+            station to claim together.
+        batch_window: The longest time to wait for more bookings to claim
+            together in seconds.
+
+    Returns:
+        A list of SchedulingJob objects.
+    """
+    if batch_size > 1:
+        jobs = queue.get_batch(batch_size, batch_window)
+    else:
+        jobs = [queue.get()]
+
+    if jobs[0].fleet_job is not None:
+        jobs += database.fetch_jobs(MAX_FLEET_SIZE,
+                                    fleet_job=jobs[0].fleet_job,
+                                    exclude=[job.ev_id for job in jobs])
+    return jobs
+
+
+def next_pending_job(database, pending):
+    """Takes the next booking left over from a batch and renews its lease,
+    as a long queue of leftovers can take longer to schedule than the lease
+    lasts. Bookings whose lease has been taken over by another worker are
+    dropped.
+
+    Args:
+        database: The SchedulerDatabase the bookings were claimed from.
+        pending: The list of leftover SchedulingJob objects, which the
+            returned and dropped bookings are removed from.
+
+    Returns:
+        A SchedulingJob object, or None once there are no leftovers.
+    """
+    while pending:
+        job = pending.pop(0)
+        if database.renew_lease(job.ev_id):
+            return job
+    return None
+
+
+def recover(database, jobs, error):
+    """Retries bookings later after their results could not be written,
+    because the connection was lost while a station was locked or the lock
+    could not be taken. Anything the lost connection had not committed was
+    rolled back by the server.
+
+    Args:
+        database: The SchedulerDatabase the bookings were claimed from.
+        jobs: A list of the SchedulingJob objects of the bookings.
+        error: The connection error or TimeoutError that was raised.
+    """
+    print("Could not write the schedules, retrying later: {}".format(error))
+    if not isinstance(error, TimeoutError):
+        database.reconnect()
+    for job in jobs:
+        database.defer_job(job.ev_id, RETRY_DELAY)
+
+
+def run_worker(listen_for_wake_ups=True, batch_size=1, batch_window=0.2,
+               solve_timeout=30):
+    """Schedules the bookings waiting in the Scheduler database, sleeping
+    while there are none. Several workers can run at once.
+
+    Args:
+        listen_for_wake_ups: Whether the worker listens on the shared wake up
+            port. Workers that do not only check the database periodically.
+        batch_size: The largest number of bookings for the same charging
+            station to schedule together in one solve.
+        batch_window: The longest time to wait for more bookings to schedule
+            together in seconds.
+        solve_timeout: The time limit of a solve in seconds. A booking whose
+            solve goes over the limit or fails is retried later, up to
+            MAX_SOLVE_ATTEMPTS times.
+    """
+    database = SchedulerDatabase()
+    queue = JobQueue(database) if listen_for_wake_ups \
+        else JobQueue(database, port=0)
+    forecasts = ForecastCache(on_refresh=publish_forecast)
+    forecasts.get()
+    forecasts.start()
+    solver = SolverProcess(solve_timeout)
+    bookings = BookingIndex(database)
+    solveAttempts = dict()
+    pending = []
+
+    while 1:
+
+        job = next_pending_job(database, pending)
+        if job is None:
+            jobs = claim_jobs(database, queue, batch_size, batch_window)
+            if len(jobs) > 1:
+                try:
+                    pending = schedule_batch(database, bookings,
+                                             forecasts.get(), jobs, solver)
+                except CONNECTION_ERRORS + (TimeoutError,) as e:
+                    recover(database, jobs, e)
+                continue
+            job = jobs[0]
+
+        try:
+            schedule_job(database, bookings, forecasts.get(), job, solver,
+                         solveAttempts)
+        except CONNECTION_ERRORS + (TimeoutError,) as e:
+            recover(database, [job], e)
+
+
+def main():
+    """Starts a pool of scheduler workers, one per core by default."""
+    parser = argparse.ArgumentParser(description="Run the LP Scheduler workers.")
+    parser.add_argument("-w", "--workers", type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("-b", "--batch-size", type=int, default=1,
+                        help="largest number of bookings for the same "
+                             "station to schedule in one solve")
+    parser.add_argument("--batch-window", type=float, default=0.2,
+                        help="seconds to wait for more bookings to batch")
+    parser.add_argument("-t", "--solve-timeout", type=float, default=30,
+                        help="time limit of a solve in seconds")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(True, args.batch_size, args.batch_window,
+                   args.solve_timeout)
+        return
+
+    # Without SO_REUSEPORT only one worker can bind the wake up port
+    shared_port = hasattr(socket, "SO_REUSEPORT")
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=(shared_port or i == 0,
+                                             args.batch_size,
+                                             args.batch_window,
+                                             args.solve_timeout))
+               for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+import functools
+import os
+import socket
+import time
+
+import numpy as np
+
+from database.connection_pool import CONNECTION_ERRORS, backoff_delays, get_connection
+from scheduler.lp_scheduler import ScheduleInfo
+from collections import namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+def charger_from_db(charger_id):
+    """Converts a charger ID stored in the database to the charger ID used by the LP Scheduler.
+
+    Args:
+        charger_id: The charger ID stored in the database.
+
+    Returns:
+        The charger ID used by the LP Scheduler.
+    """
+    return 0 if charger_id == 2 else charger_id
+
+
+def charger_to_db(charger_id):
+    """Converts a charger ID used by the LP Scheduler to the charger ID stored in the database.
+
+    Args:
+        charger_id: The charger ID used by the LP Scheduler.
+
+    Returns:
+        The charger ID stored in the database.
+    """
+    return (-charger_id) + 1
+
+
+BookingResult = namedtuple("BookingResult", ["ev_id", "start", "end", "station", "final_charge"])
+
+
+@dataclass
+class SchedulingJob:
+    """A booking waiting to be scheduled, joined with the vehicle it is for.
+
+    Attributes:
+        ev_id: An int as the ID of the booking (and the vehicle it is for).
+        current_charge: An int as the current charge level of the vehicle.
+        preferred_start: A datetime object as the preferred start of charging.
+        preferred_end: A datetime object as the preferred end of charging.
+        preferred_charge: An int as the preferred charge level at the end of charging.
+        preferred_station: An int as the ID of the preferred charging station, as stored in the database.
+        car: A string as the model of the vehicle.
+        battery_capacity: An int as the battery capacity of the vehicle, or None if the car model is unknown.
+        fleet_job: An int as the ID of the fleet booking the vehicle was submitted in, or None for a single booking.
+    """
+    __slots__ = ["ev_id", "current_charge", "preferred_start", "preferred_end", "preferred_charge",
+                 "preferred_station", "car", "battery_capacity", "fleet_job"]
+
+    ev_id: int
+    current_charge: int
+    preferred_start: datetime
+    preferred_end: datetime
+    preferred_charge: int
+    preferred_station: int
+    car: str
+    battery_capacity: int
+    fleet_job: int
+
+    @property
+    def charger_id(self):
+        """The preferred charging station as a charger ID used by the LP Scheduler."""
+        return charger_from_db(self.preferred_station)
+
+
+def _reconnecting(method):
+    """Decorates a SchedulerDatabase method so that it is run again on a new connection if the database connection
+    is lost. Every decorated method is a single transaction, so running it again after a lost connection has the same
+    effect as running it once. commit() is not decorated, because the transaction it would commit is lost with the
+    connection. Nothing is run again while a station lock is held, because the lock is released with the connection
+    that held it.
+    """
+    @functools.wraps(method)
+    def reconnect_and_retry(self, *args, **kwargs):
+        for delay in backoff_delays(self.retries):
+            try:
+                return method(self, *args, **kwargs)
+            except CONNECTION_ERRORS as e:
+                if self._locks_held:
+                    raise
+                print("Lost the database connection, reconnecting in {:.1f} seconds: {}".format(delay, e))
+                time.sleep(delay)
+                self.reconnect()
+
+        return method(self, *args, **kwargs)
+
+    return reconnect_and_retry
+
+
+class SchedulerDatabase:
+    """Data access for the LP Scheduler worker. Every query the worker runs against the Scheduler database goes
+    through this class.
+
+    Several workers can share the database. A worker claims a booking by taking a lease on it (Lease_Owner and
+    Lease_Expires of userdata), so no other worker schedules the same booking until the lease is released by writing
+    the booking's result, or until it expires because the worker stopped.
+
+    Connections are taken from the shared connection pool. A query that fails because the connection was lost is run
+    again on a new connection, up to retries times.
+
+    Attributes:
+        db: A MySQL connection to the Scheduler database.
+        cursor: A cursor of the connection.
+        worker_id: A string identifying the worker in the leases it takes.
+        lease_seconds: An int as the number of seconds a claimed booking stays leased to the worker.
+        retries: An int as the number of times a query is run again after the connection was lost.
+    """
+    def __init__(self, db=None, worker_id=None, lease_seconds=300, connect=get_connection, retries=3):
+        if db is None:
+            db = connect()
+        if worker_id is None:
+            worker_id = "{}:{}".format(socket.gethostname(), os.getpid())
+        self.db = db
+        self.cursor = db.cursor()
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.retries = retries
+        self._connect = connect
+        self._locks_held = 0
+
+    def reconnect(self):
+        """Replaces the connection with a new one from the pool. The old connection is returned to the pool, which
+        resets it before it is used again.
+        """
+        try:
+            self.db.close()
+        except CONNECTION_ERRORS:
+            pass
+        self.db = self._connect()
+        self.cursor = self.db.cursor()
+
+    def close(self):
+        """Returns the connection to the pool."""
+        self.db.close()
+
+    def commit(self):
+        """Commits the current transaction, which also makes changes committed by other connections visible. A lost
+        connection is not retried, as the transaction was lost with it.
+        """
+        self.db.commit()
+
+    def fetch_next_job(self):
+        """Claims the booking that has been waiting to be scheduled the longest and is not leased to another worker,
+        along with the battery capacity of its vehicle. Bookings locked by another worker's claim are skipped rather
+        than waited for. A booking already leased to this worker can be claimed again, which renews the lease.
+
+        Returns:
+            A SchedulingJob object, or None if no booking is waiting to be scheduled.
+        """
+        jobs = self.fetch_jobs(1)
+        return jobs[0] if jobs else None
+
+    @_reconnecting
+    def fetch_jobs(self, limit, station=None, start=None, end=None, exclude=(), fleet_job=None):
+        """Claims up to limit bookings in the order they have been waiting, in the same way as fetch_next_job. The
+        bookings can be limited to those for one charging station with a preferred period overlapping a given period,
+        or to those of one fleet booking, so that they can be scheduled together.
+
+        Args:
+            limit: An int as the largest number of bookings to claim.
+            station: An int as the ID of the charging station, as stored in the database, or None for any station.
+            start: A datetime object as the start of the period, or None for any period.
+            end: A datetime object as the end of the period, or None for any period.
+            exclude: A collection of IDs of bookings not to claim.
+            fleet_job: An int as the ID of a fleet booking, or None for bookings of any fleet booking.
+
+        Returns:
+            A list of SchedulingJob objects.
+        """
+        conditions, params = [], [self.worker_id]
+        if fleet_job is not None:
+            conditions.append(" AND u.Fleet_Job = %s")
+            params.append(fleet_job)
+        if station is not None:
+            conditions.append(" AND u.Preferred_Charge_Station = %s")
+            params.append(station)
+        if start is not None and end is not None:
+            conditions.append(" AND u.Preferred_Start_Datetime < %s AND u.Preferred_End_Datetime > %s")
+            params.extend((end, start))
+        if exclude:
+            conditions.append(" AND u.id NOT IN ({})".format(", ".join(["%s"] * len(exclude))))
+            params.extend(exclude)
+        params.append(limit)
+
+        self.db.commit()
+        self.cursor.execute("SELECT u.id, u.Current_Charge, u.Preferred_Start_Datetime, u.Preferred_End_Datetime, "
+                            "u.Preferred_Charge_Level, u.Preferred_Charge_Station, u.Car, c.Battery_Capacity, "
+                            "u.Fleet_Job FROM userdata u LEFT JOIN cardata c ON c.Car_Model = u.Car "
+                            "WHERE u.Is_Scheduling = 1 "
+                            "AND (u.Lease_Expires IS NULL OR u.Lease_Expires < UTC_TIMESTAMP() OR u.Lease_Owner = %s)"
+                            + "".join(conditions) +
+                            " ORDER BY u.Arrival LIMIT %s FOR UPDATE OF u SKIP LOCKED",
+                            tuple(params))
+        rows = self.cursor.fetchall()
+        if not rows:
+            self.db.commit()
+            return []
+
+        self.cursor.execute("UPDATE userdata SET Lease_Owner = %s, "
+                            "Lease_Expires = UTC_TIMESTAMP() + INTERVAL %s SECOND "
+                            "WHERE id IN ({})".format(", ".join(["%s"] * len(rows))),
+                            (self.worker_id, self.lease_seconds) + tuple(row[0] for row in rows))
+        self.db.commit()
+
+        return [SchedulingJob(ev_id=int(ev_id),
+                              current_charge=int(current_charge),
+                              preferred_start=preferred_start,
+                              preferred_end=preferred_end,
+                              preferred_charge=int(preferred_charge),
+                              preferred_station=int(preferred_station),
+                              car=car,
+                              battery_capacity=None if battery_capacity is None else int(battery_capacity),
+                              fleet_job=None if fleet_job is None else int(fleet_job))
+                for ev_id, current_charge, preferred_start, preferred_end, preferred_charge, preferred_station, car,
+                battery_capacity, fleet_job in rows]
+
+    @_reconnecting
+    def renew_lease(self, ev_id):
+        """Extends the lease on a booking claimed by this worker, so that a booking waiting its turn after its batch
+        could not be scheduled together is not claimed by another worker in the meantime.
+
+        Args:
+            ev_id: An int as the ID of the booking.
+
+        Returns:
+            True if the booking is still leased to the worker and waiting to be scheduled, otherwise False, as another
+            worker may have claimed it after the lease expired.
+        """
+        self.db.commit()
+        self.cursor.execute("SELECT id FROM userdata WHERE id = %s AND Is_Scheduling = 1 AND Lease_Owner = %s "
+                            "FOR UPDATE", (ev_id, self.worker_id))
+        if self.cursor.fetchone() is None:
+            self.db.commit()
+            return False
+
+        self.cursor.execute("UPDATE userdata SET Lease_Expires = UTC_TIMESTAMP() + INTERVAL %s SECOND WHERE id = %s",
+                            (self.lease_seconds, ev_id))
+        self.db.commit()
+        return True
+
+    @_reconnecting
+    def fetch_existing_schedules(self, start, num_timeslots, ev_id, interval_length=15):
+        """Fetches the charging booked by every vehicle other than the ones being scheduled over a window of time
+        slots, in a single range query, and groups it by time slot.
+
+        Args:
+            start: A datetime object as the start of the first time slot of the window.
+            num_timeslots: An int as the number of time slots in the window.
+            ev_id: An int as the ID of the vehicle being scheduled, or a list of IDs of the vehicles being scheduled.
+            interval_length: An int as the length of a time slot in minutes.
+
+        Returns:
+            A list with one entry per time slot of the window. Each entry is a list of ScheduleInfo objects, or None
+            if no other vehicle charges in the time slot.
+        """
+        existing_schedules = [None] * num_timeslots
+        if num_timeslots <= 0:
+            return existing_schedules
+
+        ev_ids = tuple(ev_id) if isinstance(ev_id, (list, tuple)) else (ev_id,)
+        placeholders = ", ".join(["%s"] * len(ev_ids))
+        end = start + timedelta(minutes=interval_length * (num_timeslots - 1))
+        self.cursor.execute("SELECT Timeslots, idEV, chargeInSlot, chargerID, ArrivalTime, EndTime FROM userTimes "
+                            "WHERE Timeslots BETWEEN %s AND %s AND idEV NOT IN ({})".format(placeholders),
+                            (start, end) + ev_ids)
+        rows = self.cursor.fetchall()
+        if not rows:
+            return existing_schedules
+
+        # Time slot index of every row. Rows that do not start exactly on a time slot of the window are left out, as
+        # they would not have matched any time slot before
+        interval = np.timedelta64(interval_length, "m")
+        offsets = np.array([row[0] for row in rows], dtype="datetime64[us]") - np.datetime64(start, "us")
+        on_grid = np.flatnonzero(offsets % interval == np.timedelta64(0, "us"))
+        row_timeslots = offsets[on_grid] // interval
+        order = np.argsort(row_timeslots, kind="stable")
+        row_indices = on_grid[order]
+        timeslots, first_rows = np.unique(row_timeslots[order], return_index=True)
+
+        schedules = [ScheduleInfo(ev_id=int(rows[i][1]),
+                                  charge=int(rows[i][2]),
+                                  charger_id=charger_from_db(int(rows[i][3])),
+                                  arrival=rows[i][4],
+                                  departure=rows[i][5])
+                     for i in row_indices]
+
+        for timeslot, first, last in zip(timeslots, first_rows, np.append(first_rows[1:], len(schedules))):
+            existing_schedules[timeslot] = schedules[first:last]
+
+        return existing_schedules
+
+    @_reconnecting
+    def find_clash(self, start, end, station, ev_id):
+        """Finds a booking of another vehicle at the same charging station that overlaps the given period.
+
+        Args:
+            start: A datetime object as the start of the period.
+            end: A datetime object as the end of the period.
+            station: An int as the ID of the charging station, as stored in the database.
+            ev_id: An int as the ID of the vehicle being scheduled.
+
+        Returns:
+            A datetime object as the end of the first clashing booking, or None if nothing clashes.
+        """
+        self.cursor.execute("SELECT Scheduled_Datetime_End FROM userdata WHERE Scheduled_Datetime_Start < %s "
+                            "AND Scheduled_Datetime_End > %s AND Charging_Station = %s AND id <> %s",
+                            (end, start, station, ev_id))
+        rows = self.cursor.fetchall()
+        return rows[0][0] if rows else None
+
+    @_reconnecting
+    def fetch_station_bookings(self, station, after):
+        """Fetches the bookings of a charging station that end after the given time, sorted by start.
+
+        Args:
+            station: An int as the ID of the charging station, as stored in the database.
+            after: A datetime object as the earliest end of the bookings to fetch.
+
+        Returns:
+            A list of tuples of the vehicle ID, start and end of each booking.
+        """
+        self.cursor.execute("SELECT id, Scheduled_Datetime_Start, Scheduled_Datetime_End FROM userdata "
+                            "WHERE Charging_Station = %s AND Scheduled_Datetime_End > %s "
+                            "ORDER BY Scheduled_Datetime_Start", (station, after))
+        return [(int(ev_id), start, end) for ev_id, start, end in self.cursor.fetchall()]
+
+    @_reconnecting
+    def fetch_station_version(self, station):
+        """Fetches the version of a charging station's bookings, which changes whenever a booking of the station is
+        written or freed.
+
+        Args:
+            station: An int as the ID of the charging station, as stored in the database.
+
+        Returns:
+            An int as the version, 0 if the station's bookings have never changed.
+        """
+        self.cursor.execute("SELECT Version FROM stationversions WHERE Station = %s", (station,))
+        row = self.cursor.fetchone()
+        return 0 if row is None else int(row[0])
+
+    @contextmanager
+    def station_lock(self, station, timeout=30):
+        """Holds a named database lock for a charging station, so that only one worker at a time checks for clashes
+        at the station and writes a schedule for it.
+
+        Args:
+            station: An int as the ID of the charging station, as stored in the database.
+            timeout: The longest time to wait for the lock in seconds.
+
+        Raises:
+            TimeoutError: If the lock could not be acquired within the timeout.
+            CONNECTION_ERRORS: If the connection is lost while holding the lock. The lock is released along with the
+                connection's session.
+        """
+        name = "ev_scheduler_station_{}".format(station)
+        self.cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        acquired = self.cursor.fetchone()
+        if acquired is None or acquired[0] != 1:
+            raise TimeoutError("Could not lock charging station {}".format(station))
+
+        self._locks_held += 1
+        try:
+            yield
+        finally:
+            self._locks_held -= 1
+            try:
+                self.cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+                self.cursor.fetchone()
+            except CONNECTION_ERRORS:
+                # The server released the lock when the connection's session ended
+                pass
+
+    @_reconnecting
+    def mark_failed(self, ev_id):
+        """Flags a booking as failed and stops it from being scheduled again.
+
+        Args:
+            ev_id: An int as the ID of the booking.
+        """
+        self.cursor.execute("UPDATE userdata SET Error = %s, Is_Scheduling = %s, Lease_Owner = NULL, "
+                            "Lease_Expires = NULL WHERE id = %s", ("1", "0", ev_id))
+        self.db.commit()
+
+    @_reconnecting
+    def defer_job(self, ev_id, delay):
+        """Releases a claimed booking without a result, so that any worker can claim it again once the delay has
+        passed.
+
+        Args:
+            ev_id: An int as the ID of the booking.
+            delay: An int as the number of seconds before the booking can be claimed again.
+        """
+        self.cursor.execute("UPDATE userdata SET Lease_Owner = NULL, "
+                            "Lease_Expires = UTC_TIMESTAMP() + INTERVAL %s SECOND WHERE id = %s", (delay, ev_id))
+        self.db.commit()
+
+    def save_schedule(self, ev_id, changes, start, end, station, final_charge):
+        """Writes the time slots of a new schedule and the booking's allocated charging period in a single
+        transaction, so the web application never sees a partly written schedule. Nothing is written if any statement
+        fails.
+
+        Args:
+            ev_id: An int as the ID of the scheduled vehicle.
+            changes: A dictionary of the inserted, updated and removed timetable entries, as given by Timetable.diff.
+            start: A datetime object as the allocated start of charging.
+            end: A datetime object as the allocated end of charging.
+            station: An int as the ID of the allocated charging station, as stored in the database.
+            final_charge: The charge level of the vehicle at the end of charging.
+        """
+        self.save_schedules([BookingResult(ev_id, start, end, station, final_charge)], changes)
+
+    @_reconnecting
+    def save_schedules(self, results, changes):
+        """Writes the time slots of a new schedule for several bookings and their allocated charging periods in a
+        single transaction, in the same way as save_schedule.
+
+        Args:
+            results: A list of BookingResult tuples, one for each scheduled booking.
+            changes: A dictionary of the inserted, updated and removed timetable entries, as given by Timetable.diff.
+        """
+        try:
+            self.cursor.execute("DELETE FROM userTimes WHERE idEV IN ({})".format(", ".join(["%s"] * len(results))),
+                                tuple(result.ev_id for result in results))
+
+            if changes["removed"]:
+                self.cursor.executemany("DELETE FROM userTimes WHERE idEV = %s AND Timeslots = %s",
+                                        [(entry.ev_id, entry.slot) for entry in changes["removed"]])
+
+            if changes["updated"]:
+                self.cursor.executemany("UPDATE userTimes SET chargeInSlot = %s, ArrivalTime = %s, EndTime = %s, "
+                                        "chargerID = %s WHERE idEV = %s AND Timeslots = %s",
+                                        [(entry.charge, entry.arrival, entry.departure,
+                                          charger_to_db(entry.charger_id), entry.ev_id, entry.slot)
+                                         for entry in changes["updated"]])
+
+            if changes["inserted"]:
+                # Inserts are sent as a single multi-row INSERT by the connector
+                self.cursor.executemany("INSERT INTO userTimes(idEV, chargeInSlot, Timeslots, ArrivalTime, EndTime, "
+                                        "chargerID) VALUES (%s, %s, %s, %s, %s, %s)",
+                                        [(entry.ev_id, entry.charge, entry.slot, entry.arrival, entry.departure,
+                                          charger_to_db(entry.charger_id))
+                                         for entry in changes["inserted"]])
+
+            self.cursor.executemany("UPDATE userdata SET Scheduled_Datetime_Start = %s, Scheduled_Datetime_End = %s, "
+                                    "Charging_Station = %s, Final_Charge = %s, Is_Scheduling = %s, Lease_Owner = NULL, "
+                                    "Lease_Expires = NULL WHERE id = %s",
+                                    [(result.start, result.end, result.station, result.final_charge, "0", result.ev_id)
+                                     for result in results])
+            self.cursor.executemany("INSERT INTO stationversions(Station, Version) VALUES (%s, 1) "
+                                    "ON DUPLICATE KEY UPDATE Version = Version + 1",
+                                    [(station,) for station in sorted({result.station for result in results})])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    @_reconnecting
+    def save_forecast(self, forecast, max_capacity, interval_length=15):
+        """Stores the forecast of each time slot of a settlement date, so that the web application can report the
+        utilisation of the charging stations, and moves the forecast's cache version on.
+
+        Args:
+            forecast: A Forecast whose arrays hold one value per time slot from the start of the settlement date.
+            max_capacity: The largest amount of charge the grid can supply in a time slot.
+            interval_length: An int as the length of a time slot in minutes.
+        """
+        midnight = datetime.combine(forecast.settlement_date, datetime.min.time())
+        self.cursor.executemany("INSERT INTO slotforecast(Timeslot, Traditional_Production, Consumption, "
+                                "Renewable_Production, Max_Capacity) VALUES (%s, %s, %s, %s, %s) "
+                                "ON DUPLICATE KEY UPDATE Traditional_Production = VALUES(Traditional_Production), "
+                                "Consumption = VALUES(Consumption), Renewable_Production = VALUES(Renewable_Production), "
+                                "Max_Capacity = VALUES(Max_Capacity)",
+                                [(midnight + timedelta(minutes=interval_length * i), float(traditional),
+                                  float(consumption), float(renewable), max_capacity)
+                                 for i, (traditional, consumption, renewable)
+                                 in enumerate(zip(forecast.traditional_production, forecast.consumption,
+                                                  forecast.renewable_production))])
+        self.cursor.execute("INSERT INTO cacheversions(Name, Version) VALUES (%s, 1) "
+                            "ON DUPLICATE KEY UPDATE Version = Version + 1", ("forecast",))
+        self.db.commit()
+
+    @_reconnecting
+    def save_suggestion(self, ev_id, start, end):
+        """Stores a suggested charging period for a booking whose preferred period clashed with another booking.
+
+        Args:
+            ev_id: An int as the ID of the booking.
+            start: A datetime object as the suggested start of charging.
+            end: A datetime object as the suggested end of charging.
+        """
+        self.cursor.execute("UPDATE userdata SET New_Sugg_Start = %s, New_Sugg_End = %s, Is_Scheduling = %s, "
+                            "Slot_Taken = %s, Lease_Owner = NULL, Lease_Expires = NULL WHERE id = %s",
+                            (start, end, "0", "1", ev_id))
+        self.db.commit()
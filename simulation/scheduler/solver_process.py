@@ -0,0 +1,93 @@
+import multiprocessing
+
+from scheduler.lp_scheduler import LPScheduler, Timetable
+
+
+class SolveTimeout(Exception):
+    """Raised when a solve takes longer than the time limit of the SolverProcess."""
+
+
+def _serve(connection):
+    """Runs in the solver subprocess. Schedules each request received on the connection and sends back the timetable
+    in its binary format, until the connection is closed.
+
+    Args:
+        connection: The subprocess' end of the pipe to the worker.
+    """
+    while True:
+        try:
+            scheduler_args, vehicles, timeslots = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            timetable = LPScheduler(*scheduler_args).schedule(vehicles, timeslots)
+            connection.send((True, None if timetable is None else timetable.to_bytes()))
+        except Exception as e:
+            connection.send((False, repr(e)))
+
+
+class SolverProcess:
+    """Runs LP Scheduler solves in a supervised subprocess with a wall clock time limit, so that one slow solve cannot
+    hold up the worker. A subprocess that goes over the limit is killed and replaced by a fresh one for the next solve.
+
+    Attributes:
+        timeout: The time limit of a solve in seconds.
+    """
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self._process = None
+        self._connection = None
+
+    def solve(self, scheduler_args, vehicles, timeslots):
+        """Schedules the vehicles in the subprocess.
+
+        Args:
+            scheduler_args: A tuple of the arguments to create the LPScheduler with.
+            vehicles: A list of VehicleInfo objects to schedule.
+            timeslots: A list of TimeSlotInfo objects to schedule the vehicles in.
+
+        Returns:
+            The Timetable returned by LPScheduler.schedule, or None if the inputs were not valid.
+
+        Raises:
+            SolveTimeout: If the solve did not finish within the time limit.
+            RuntimeError: If the solve raised an exception in the subprocess.
+        """
+        if self._process is None or not self._process.is_alive():
+            self._start()
+
+        self._connection.send((scheduler_args, vehicles, timeslots))
+        if not self._connection.poll(self.timeout):
+            self._stop()
+            raise SolveTimeout("Solve took longer than {} seconds".format(self.timeout))
+
+        try:
+            succeeded, result = self._connection.recv()
+        except EOFError:
+            self._stop()
+            raise RuntimeError("Solver process exited during the solve")
+
+        if not succeeded:
+            raise RuntimeError("Solve failed: " + result)
+        return None if result is None else Timetable.from_bytes(result)
+
+    def close(self):
+        """Stops the subprocess."""
+        self._stop()
+
+    def _start(self):
+        self._stop()
+        self._connection, child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child_connection,), daemon=True)
+        self._process.start()
+        child_connection.close()
+
+    def _stop(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._process = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,73 @@
+import unittest
+
+from scheduler.booking_index import BookingIndex, StationBookings
+from scheduler.scheduler_db import BookingResult
+from datetime import datetime, timedelta
+
+
+class FakeDatabase:
+    def __init__(self, bookings):
+        self.bookings = bookings
+        self.version = 0
+        self.loads = 0
+
+    def fetch_station_version(self, station):
+        return self.version
+
+    def fetch_station_bookings(self, station, after):
+        self.loads += 1
+        return self.bookings
+
+
+class BookingIndexTest(unittest.TestCase):
+    START = datetime(2021, 5, 25, hour=15)
+
+    def period(self, start_minutes, end_minutes):
+        return self.START + timedelta(minutes=start_minutes), self.START + timedelta(minutes=end_minutes)
+
+    def create_bookings(self):
+        """Creates bookings from 0 to 30, 60 to 90 and 105 to 120 minutes after START."""
+        return StationBookings([(3, *self.period(60, 90)), (1, *self.period(0, 30)), (2, *self.period(105, 120))])
+
+    def test_find_clash(self):
+        """Only periods overlapping another vehicle's booking clash, and the end of the clashing booking is given."""
+        bookings = self.create_bookings()
+
+        self.assertEqual(self.period(0, 30)[1], bookings.find_clash(*self.period(15, 45)))
+        self.assertEqual(self.period(105, 120)[1], bookings.find_clash(*self.period(30, 120)))
+        self.assertIsNone(bookings.find_clash(*self.period(30, 60)))
+        self.assertIsNone(bookings.find_clash(*self.period(60, 90), ev_id=3))
+
+    def test_find_free_period(self):
+        """The suggested period is the earliest one of the same length that fits between the bookings."""
+        bookings = self.create_bookings()
+
+        self.assertEqual(self.period(30, 60), bookings.find_free_period(self.period(0, 0)[0], timedelta(minutes=30)))
+        self.assertEqual(self.period(120, 160), bookings.find_free_period(self.period(0, 0)[0], timedelta(minutes=40)))
+
+    def test_rebooking_replaces_booking(self):
+        """A vehicle that is booked again only keeps its new booking."""
+        bookings = self.create_bookings()
+        bookings.add(1, *self.period(30, 45))
+
+        self.assertEqual(3, len(bookings))
+        self.assertIsNone(bookings.find_clash(*self.period(0, 30)))
+
+    def test_index_is_reloaded_when_station_changes(self):
+        """The bookings are kept between jobs, and loaded again only when another writer changed the station."""
+        database = FakeDatabase([(1, *self.period(0, 30))])
+        index = BookingIndex(database)
+
+        index.station(1)
+        index.record([BookingResult(2, *self.period(30, 60), 1, 80)])
+        database.version = 1
+        self.assertEqual(2, len(index.station(1)))
+        self.assertEqual(1, database.loads)
+
+        database.version = 2
+        self.assertEqual(1, len(index.station(1)))
+        self.assertEqual(2, database.loads)
+
+
+if __name__ == "__main__":
+    unittest.main()
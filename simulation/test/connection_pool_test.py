@@ -0,0 +1,154 @@
+import os
+import unittest
+
+import database.connection_pool as connection_pool
+
+from mysql.connector import errors
+from scheduler.scheduler_db import SchedulerDatabase
+from unittest import mock
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        if self.connection.failures:
+            self.connection.failures -= 1
+            raise errors.OperationalError("Lost connection to MySQL server during query")
+        self.connection.queries.append((query, params))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Connection that fails its first few queries as if the server had gone away."""
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.queries = []
+        self.pings = 0
+        self.closed = False
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self.pings += 1
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, connections):
+        self.connections = connections
+
+    def get_connection(self):
+        connection = self.connections.pop(0)
+        if isinstance(connection, Exception):
+            raise connection
+        return connection
+
+
+@mock.patch("time.sleep")
+class ConnectionPoolTest(unittest.TestCase):
+    def use_pool(self, connections):
+        pool_patch = mock.patch.multiple(connection_pool, _pool=FakePool(connections), _pool_pid=os.getpid())
+        pool_patch.start()
+        self.addCleanup(pool_patch.stop)
+
+    def test_connection_is_checked_and_given_timeout(self, sleep):
+        """A connection from the pool is pinged and has the statement timeout set before it is used."""
+        connection = FakeConnection()
+        self.use_pool([connection])
+
+        with connection_pool.connection() as db:
+            self.assertIs(connection, db)
+        self.assertEqual(1, connection.pings)
+        self.assertEqual([("SET SESSION MAX_EXECUTION_TIME = %s", (connection_pool.STATEMENT_TIMEOUT,))],
+                         connection.queries)
+        self.assertTrue(connection.closed)
+
+    def test_get_connection_retries_with_backoff(self, sleep):
+        """Failing to get a connection is retried after a growing delay."""
+        connection = FakeConnection()
+        self.use_pool([errors.PoolError("Failed getting connection; pool exhausted"),
+                       errors.InterfaceError("Can't connect to MySQL server"), connection])
+
+        self.assertIs(connection, connection_pool.get_connection())
+        first_delay, second_delay = [call.args[0] for call in sleep.call_args_list]
+        self.assertLess(first_delay, second_delay)
+
+    def test_get_connection_gives_up(self, sleep):
+        """The last error is raised once every attempt has failed."""
+        self.use_pool([errors.InterfaceError("Can't connect to MySQL server")] * 3)
+
+        with self.assertRaises(errors.InterfaceError):
+            connection_pool.get_connection(attempts=3)
+        self.assertEqual(2, sleep.call_count)
+
+    def test_lost_connection_is_replaced(self, sleep):
+        """A query that fails on a lost connection is run again on a new connection from the pool."""
+        lost, replacement = FakeConnection(failures=1), FakeConnection()
+        database = SchedulerDatabase(lost, worker_id="worker-1", connect=lambda: replacement)
+
+        database.mark_failed(4)
+
+        self.assertTrue(lost.closed)
+        self.assertIs(replacement, database.db)
+        self.assertEqual(1, len(replacement.queries))
+
+    def test_lost_connection_is_not_retried_under_station_lock(self, sleep):
+        """A query inside a station lock is not run again, as the lock was lost with the connection."""
+        connection = FakeConnection()
+        connection.cursor = lambda: cursor
+        cursor = FakeCursor(connection)
+        cursor.fetchone = lambda: (1,)
+        database = SchedulerDatabase(connection, worker_id="worker-1", connect=FakeConnection)
+
+        with self.assertRaises(errors.OperationalError):
+            with database.station_lock(1):
+                connection.failures = 1
+                database.find_clash(None, None, 1, 4)
+        self.assertIs(connection, database.db)
+
+    def test_lock_on_lost_connection_is_not_released(self, sleep):
+        """The lock of a lost connection is not released again, so only the error of the lost query is raised."""
+        connection = FakeConnection()
+        connection.cursor = lambda: cursor
+        cursor = FakeCursor(connection)
+        cursor.fetchone = lambda: (1,)
+        database = SchedulerDatabase(connection, worker_id="worker-1", connect=FakeConnection)
+
+        with self.assertRaisesRegex(errors.OperationalError, "during query"):
+            with database.station_lock(1):
+                connection.failures = 2
+                database.find_clash(None, None, 1, 4)
+        self.assertEqual(0, database._locks_held)
+
+    def test_commit_is_not_retried(self, sleep):
+        """A commit that fails on a lost connection is not run again on a new connection."""
+        connection = FakeConnection()
+        database = SchedulerDatabase(connection, worker_id="worker-1", connect=FakeConnection)
+
+        def lose_connection():
+            raise errors.OperationalError("Lost connection to MySQL server during query")
+        connection.commit = lose_connection
+
+        with self.assertRaises(errors.OperationalError):
+            database.commit()
+        self.assertIs(connection, database.db)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from scheduler.forecast_cache import ForecastCache
+from datetime import datetime, timedelta
+
+
+class ForecastCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime(2021, 5, 25, hour=15)
+        self.downloads = 0
+        self.loads = 0
+
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        self.cache = ForecastCache(download=self.download, load=self.load, paths=[self.path], clock=lambda: self.now)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def download(self):
+        self.downloads += 1
+
+    def load(self):
+        self.loads += 1
+        return np.full(4, 10.0), np.full(4, 2.0), np.full(4, float(self.loads))
+
+    def test_forecast_is_reused(self):
+        """Scheduling more bookings on the same day reuses the loaded forecast."""
+        forecast = self.cache.get()
+        self.now += timedelta(minutes=10)
+
+        self.assertIs(forecast, self.cache.get())
+        self.assertEqual((1, 1), (self.downloads, self.loads))
+        self.assertEqual(self.now.date(), forecast.settlement_date)
+        self.assertTrue(np.array_equal([1.0] * 4, forecast.renewable_production))
+
+    def test_forecast_expires(self):
+        """A forecast older than max_age is downloaded again, as is the forecast of a new day."""
+        self.cache.get()
+        self.now += timedelta(minutes=31)
+        self.cache.get()
+        self.now += timedelta(days=1)
+        self.assertEqual(self.now.date(), self.cache.get().settlement_date)
+
+        self.assertEqual((3, 3), (self.downloads, self.loads))
+
+    def test_refresh_callback(self):
+        """Each newly loaded forecast is passed to on_refresh, and a failing callback does not stop scheduling."""
+        refreshed = []
+
+        def on_refresh(forecast):
+            refreshed.append(forecast)
+            raise OSError("Database unavailable")
+        self.cache.on_refresh = on_refresh
+
+        forecast = self.cache.get()
+        self.assertEqual([forecast], refreshed)
+        self.assertIs(forecast, self.cache.get())
+
+    def test_changed_file_is_parsed_again(self):
+        """A change to one of the forecast files makes the forecast load again."""
+        self.cache.get()
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        self.assertEqual(2.0, self.cache.get().renewable_production[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import threading
+import time
+import unittest
+
+from scheduler.job_queue import JobQueue, notify
+
+
+class FakeDatabase:
+    """Database that has no bookings until one is added."""
+    def __init__(self):
+        self.job = None
+        self.fetches = 0
+
+    def fetch_next_job(self):
+        self.fetches += 1
+        return self.job
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.database = FakeDatabase()
+        self.queue = JobQueue(self.database, port=0, min_wait=0.01, max_wait=0.04)
+
+    def tearDown(self):
+        self.queue.close()
+
+    def test_get_returns_waiting_job(self):
+        """A booking that is already waiting is returned without waiting for a wake up message."""
+        self.database.job = "job"
+
+        self.assertEqual("job", self.queue.get())
+        self.assertEqual(1, self.database.fetches)
+
+    def test_wait_backs_off_while_idle(self):
+        """The time between database checks doubles while there is no booking, up to the maximum wait."""
+        self.queue._wait_for_wake_up()
+        self.assertEqual(0.02, self.queue.wait)
+        self.queue._wait_for_wake_up()
+        self.queue._wait_for_wake_up()
+        self.assertEqual(0.04, self.queue.wait)
+
+    def test_notify_wakes_worker(self):
+        """A wake up message makes the worker check the database straight away and resets the backoff."""
+        self.queue.max_wait = self.queue.wait = 10
+
+        def add_job():
+            time.sleep(0.05)
+            self.database.job = "job"
+            self.assertTrue(notify(*self.queue.address))
+        threading.Thread(target=add_job).start()
+
+        started = time.monotonic()
+        self.assertEqual("job", self.queue.get())
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(self.queue.min_wait, self.queue.wait)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""Microbenchmark for the LP Scheduler's post-solve stage (creating the new time periods, schedule statuses and the
+timetable from the solver's charge matrices).
+
+Compares the NumPy implementation in LPScheduler against the previous loop-based implementation, which is kept
+below for reference, and checks that both produce the same timetable.
+
+Run from the simulation directory with: PYTHONPATH=. python test/lp_postprocess_benchmark.py
+"""
+
+import random
+import timeit
+
+from scheduler.lp_scheduler import LPScheduler, ScheduleInfo, Timetable, VehicleInfo
+from datetime import datetime, timedelta
+
+NUM_EVS = 500
+NUM_SCHEDULED_EVS = 500
+NUM_TS = 192
+REPEATS = 5
+
+
+def legacy_create_new_time_period_schedule(charge_matrix, first_interval, last_interval):
+    num_evs, num_ts = len(charge_matrix), len(charge_matrix[0])
+    new_time_period = []
+
+    for ev_i in range(num_evs):
+        new_time_period.append(dict())
+        curr_time = first_interval
+        for ts_i in range(num_ts):
+            if charge_matrix[ev_i][ts_i] > 0:
+                new_time_period[ev_i]["arrival"] = curr_time
+                break
+            curr_time += timedelta(minutes=15)
+
+        curr_time = last_interval
+        for ts_i in range(num_ts - 1, 0, -1):
+            if charge_matrix[ev_i][ts_i-1] > 0:
+                new_time_period[ev_i]["departure"] = curr_time
+                break
+            curr_time -= timedelta(minutes=15)
+
+    return new_time_period
+
+
+def legacy_create_timetable(charge_matrix, ts_allocations, new_time_period_schedule, offset,
+                            ev_info, scheduled_ev_ts_allocations, scheduled_ev_charge_matrix,
+                            scheduled_ev_info, scheduled_evs):
+    num_evs, num_ts = len(charge_matrix), len(charge_matrix[0])
+    schedule_status = dict()
+    timetable = [[] for ts in range(num_ts)]
+
+    for ts_i in range(num_ts):
+        for ev_i in range(num_evs):
+            if charge_matrix[ev_i][ts_i] > 0:
+                timetable[ts_i].append(ScheduleInfo(ev_info[ev_i].id,
+                                                    charge_matrix[ev_i][ts_i],
+                                                    ev_info[ev_i].charger_id,
+                                                    new_time_period_schedule[ev_i]["arrival"],
+                                                    new_time_period_schedule[ev_i]["departure"]))
+
+    for ev_i in range(num_evs):
+        if all(ev_charge_row == 0 for ev_charge_row in charge_matrix[ev_i]):
+            if all(ts_allocation_row == 0 for ts_allocation_row in ts_allocations[ev_i]):
+                schedule_status[ev_i] = Timetable.CHARGER_CONFLICT
+            else:
+                schedule_status[ev_i] = Timetable.SCHEDULE_INFEASIBLE
+        else:
+            schedule_status[ev_i] = Timetable.SCHEDULED_SUCCESSFULLY
+
+    for ts_i in range(num_ts):
+        for ev_i in range(len(scheduled_evs)):
+            if scheduled_ev_ts_allocations[ev_i][ts_i] > 0:
+                ev_id = scheduled_ev_info["ev_ids"][ev_i]
+                timetable[ts_i].append(ScheduleInfo(ev_id,
+                                                    scheduled_ev_charge_matrix[ev_i][ts_i],
+                                                    scheduled_ev_info["charger_ids"][ev_i],
+                                                    scheduled_evs[ev_id].time_period[0],
+                                                    scheduled_evs[ev_id].time_period[1]))
+
+    return timetable, schedule_status
+
+
+def generate_solver_output(first_interval):
+    """Generates charge and allocation matrices shaped like the solver's output. Every vehicle charges in a
+    contiguous window that ends before the last time slot.
+
+    Returns:
+        A tuple of the arguments taken by the post-solve stage (except the new time period schedule).
+    """
+    def window():
+        start = random.randint(0, NUM_TS - 10)
+        return start, random.randint(start + 1, NUM_TS - 1)
+
+    ts_allocations, charge_matrix, ev_info = [], [], []
+    for ev_i in range(NUM_EVS):
+        start, end = window()
+        ts_allocations.append([1 if start <= ts_i < end else 0 for ts_i in range(NUM_TS)])
+        charge_matrix.append([float(random.randint(0, 12)) if ts_allocations[ev_i][ts_i] else 0.0
+                              for ts_i in range(NUM_TS)])
+        ev_info.append(VehicleInfo(ev_i, (first_interval, first_interval), 0, 100, 100, ev_i % 2))
+
+    scheduled_ev_ts_allocations, scheduled_ev_charge_matrix, scheduled_evs = [], [], dict()
+    scheduled_ev_ids = list(range(NUM_EVS, NUM_EVS + NUM_SCHEDULED_EVS))
+    for ev_id in scheduled_ev_ids:
+        start, end = window()
+        scheduled_ev_ts_allocations.append([1 if start <= ts_i < end else 0 for ts_i in range(NUM_TS)])
+        scheduled_ev_charge_matrix.append([float(random.randint(0, 12)) if allocation else 0.0
+                                           for allocation in scheduled_ev_ts_allocations[-1]])
+        scheduled_evs[ev_id] = VehicleInfo(ev_id,
+                                           [first_interval + timedelta(minutes=15 * start),
+                                            first_interval + timedelta(minutes=15 * end)],
+                                           0, 100, 0, ev_id % 2)
+    scheduled_ev_info = {"ev_ids": scheduled_ev_ids, "charger_ids": [ev_id % 2 for ev_id in scheduled_ev_ids]}
+
+    return (charge_matrix, ts_allocations, ev_info, scheduled_ev_ts_allocations, scheduled_ev_charge_matrix,
+            scheduled_ev_info, scheduled_evs)
+
+
+def main():
+    random.seed(0)
+    first_interval = datetime(2021, 3, 5)
+    last_interval = first_interval + timedelta(minutes=15 * (NUM_TS - 1))
+    (charge_matrix, ts_allocations, ev_info, scheduled_ev_ts_allocations, scheduled_ev_charge_matrix,
+     scheduled_ev_info, scheduled_evs) = generate_solver_output(first_interval)
+    scheduler = LPScheduler([], [], [], [50, 50])
+
+    def run_legacy():
+        new_time_period = legacy_create_new_time_period_schedule(charge_matrix, first_interval, last_interval)
+        return legacy_create_timetable(charge_matrix, ts_allocations, new_time_period, first_interval, ev_info,
+                                       scheduled_ev_ts_allocations, scheduled_ev_charge_matrix, scheduled_ev_info,
+                                       scheduled_evs)
+
+    def run_vectorised():
+        new_time_period = scheduler._create_new_time_period_schedule(charge_matrix, first_interval, last_interval)
+        return scheduler._create_timetable(charge_matrix, ts_allocations, new_time_period, first_interval, ev_info,
+                                           scheduled_ev_ts_allocations, scheduled_ev_charge_matrix,
+                                           scheduled_ev_info, scheduled_evs)
+
+    legacy_timetable, legacy_status = run_legacy()
+    timetable = run_vectorised()
+    assert timetable.timetable == legacy_timetable, "Timetables differ"
+    assert timetable.get_schedule_status() == legacy_status, "Schedule statuses differ"
+
+    legacy_time = min(timeit.repeat(run_legacy, number=1, repeat=REPEATS))
+    vectorised_time = min(timeit.repeat(run_vectorised, number=1, repeat=REPEATS))
+    materialised_time = min(timeit.repeat(lambda: run_vectorised().timetable, number=1, repeat=REPEATS))
+
+    print("{} new and {} existing vehicles over {} time slots ({} timetable entries)"
+          .format(NUM_EVS, NUM_SCHEDULED_EVS, NUM_TS, len(timetable.charges)))
+    print("Loop-based post-processing:     {:8.2f} ms".format(legacy_time * 1000))
+    print("Vectorised post-processing:     {:8.2f} ms ({:.1f}x)".format(vectorised_time * 1000,
+                                                                        legacy_time / vectorised_time))
+    print("Vectorised + list of lists view: {:7.2f} ms".format(materialised_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
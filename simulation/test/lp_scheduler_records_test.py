@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from scheduler.lp_scheduler import ScheduleInfo, ScheduleBatch, TimeSlotInfo, TimeSlotBatch, VehicleInfo, \
+                                   VehicleBatch
+from datetime import datetime, timedelta
+
+
+class LPSchedulerRecordsTest(unittest.TestCase):
+    START = datetime(2021, 5, 25, hour=15)
+    END = datetime(2021, 5, 25, hour=16)
+
+    def test_records_have_no_instance_dict(self):
+        """Record types use __slots__ so that no per-instance dictionary is allocated."""
+        schedule = ScheduleInfo(0, 5, 0, self.START, self.END)
+        timeslot = TimeSlotInfo(self.START, 10, 0, 0, 50, [0])
+        vehicle = VehicleInfo(0, (self.START, self.END), 50, 60, 100, 0)
+
+        for record in (schedule, timeslot, vehicle):
+            self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_timeslot_info_copies_available_chargers(self):
+        """Changes to the caller's list of available chargers must not leak into the TimeSlotInfo."""
+        chargers = [0, 1]
+        timeslot = TimeSlotInfo(self.START, 10, 0, 0, 50, chargers)
+        chargers.remove(0)
+
+        self.assertEqual([0, 1], timeslot.available_chargers)
+
+    def test_schedule_batch_round_trips_schedules(self):
+        """A ScheduleBatch gives back the same ScheduleInfo objects it was created from."""
+        schedules = [ScheduleInfo(ev_id, ev_id * 2.5, ev_id % 2, self.START, self.END + timedelta(minutes=ev_id))
+                     for ev_id in range(5)]
+        batch = ScheduleBatch.from_schedules(schedules)
+
+        self.assertEqual(5, len(batch))
+        self.assertEqual(schedules, list(batch))
+
+    def test_schedule_batch_is_valid_is_vectorised(self):
+        """ScheduleBatch.is_valid returns one flag per record that agrees with ScheduleInfo.is_valid."""
+        schedules = [ScheduleInfo(0, 5, 0, self.START, self.END),
+                     ScheduleInfo(-1, 5, 0, self.START, self.END),
+                     ScheduleInfo(2, 5, -3, self.START, self.END),
+                     ScheduleInfo(3, 5, 1, None, self.END)]
+        batch = ScheduleBatch.from_schedules(schedules)
+
+        self.assertEqual([s.is_valid() for s in schedules], batch.is_valid().tolist())
+
+    def test_vehicle_batch_is_valid_is_vectorised(self):
+        """VehicleBatch.is_valid returns one flag per vehicle that agrees with VehicleInfo.is_valid."""
+        vehicles = [VehicleInfo(0, (self.START, self.END), 50, 60, 100, 0),
+                    VehicleInfo(1, (self.START, self.END), 150, 60, 100, 0),
+                    VehicleInfo(2, (self.START, self.END), 50, 60, -100, 0),
+                    VehicleInfo(3, (self.START, None), 50, 60, 100, 1)]
+        batch = VehicleBatch.from_vehicles(vehicles)
+
+        self.assertEqual([ev.is_valid() for ev in vehicles], batch.is_valid().tolist())
+        self.assertEqual(vehicles[0], batch[0])
+
+    def test_timeslot_batch_is_valid_is_vectorised(self):
+        """TimeSlotBatch.is_valid returns one flag per time slot that agrees with TimeSlotInfo.is_valid."""
+        timeslots = [TimeSlotInfo(self.START, 10, 0, 0, float("inf"), [0]),
+                     TimeSlotInfo(self.START, -10, 0, 0, 50, [0]),
+                     TimeSlotInfo(self.START, 10, 0, 0, 50, [0], price_tariff=14.23)]
+        batch = TimeSlotBatch.from_timeslots(timeslots)
+
+        self.assertEqual([ts.is_valid() for ts in timeslots], batch.is_valid().tolist())
+        self.assertTrue(np.array_equal([0, 0, 14.23], batch.price_tariffs))
+        self.assertEqual(timeslots[2], batch[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import unittest
+
+import numpy as np
+
+from scheduler.booking_index import BookingIndex
+from scheduler.forecast_cache import Forecast
+from scheduler.lp_scheduler import LPScheduler
+from mysql.connector import errors
+from scheduler.run_lp_scheduler import MAX_FLEET_SIZE, MAX_SOLVE_ATTEMPTS, claim_jobs, count_timeslots, \
+    next_pending_job, recover, schedule_batch, schedule_job
+from scheduler.scheduler_db import SchedulingJob
+from scheduler.solver_process import SolveTimeout
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+
+class FakeDatabase:
+    """Database without existing time slots that records the results written to it."""
+    def __init__(self, station_bookings=(), claimable=(), lapsed=()):
+        self.station_bookings = list(station_bookings)
+        self.station_version = 0
+        self.station_loads = 0
+        self.locked = []
+        self.failed = []
+        self.deferred = []
+        self.saved = []
+        self.windows = []
+        self.reconnects = 0
+        self.claimable = list(claimable)
+        self.claims = []
+        self.lapsed = set(lapsed)
+        self.renewed = []
+
+    def commit(self):
+        pass
+
+    def fetch_jobs(self, limit, station=None, start=None, end=None, exclude=(), fleet_job=None):
+        self.claims.append((limit, fleet_job, list(exclude)))
+        return [job for job in self.claimable if job.fleet_job == fleet_job and job.ev_id not in exclude][:limit]
+
+    def renew_lease(self, ev_id):
+        self.renewed.append(ev_id)
+        return ev_id not in self.lapsed
+
+    def fetch_existing_schedules(self, start, num_timeslots, ev_id, interval_length=15):
+        self.windows.append(num_timeslots)
+        return [None] * num_timeslots
+
+    @contextmanager
+    def station_lock(self, station, timeout=30):
+        self.locked.append(station)
+        yield
+
+    def fetch_station_version(self, station):
+        return self.station_version
+
+    def fetch_station_bookings(self, station, after):
+        self.station_loads += 1
+        return self.station_bookings
+
+    def mark_failed(self, ev_id):
+        self.failed.append(ev_id)
+
+    def defer_job(self, ev_id, delay):
+        self.deferred.append(ev_id)
+
+    def reconnect(self):
+        self.reconnects += 1
+
+    def save_schedules(self, results, changes):
+        self.saved.append((results, changes))
+        self.station_bookings.extend((result.ev_id, result.start, result.end) for result in results)
+        self.station_version += 1
+
+
+class FakeQueue:
+    """Queue that hands out preset bookings."""
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+
+    def get(self):
+        return self.jobs.pop(0)
+
+    def get_batch(self, max_jobs, window):
+        jobs, self.jobs = self.jobs[:max_jobs], self.jobs[max_jobs:]
+        return jobs
+
+
+class InProcessSolver:
+    """Solver that schedules in the test process, or times out or fails every solve."""
+    def __init__(self, times_out=False, fails=False):
+        self.times_out = times_out
+        self.fails = fails
+
+    def solve(self, scheduler_args, vehicles, timeslots):
+        if self.times_out:
+            raise SolveTimeout()
+        if self.fails:
+            raise RuntimeError("Solver process exited during the solve")
+        return LPScheduler(*scheduler_args).schedule(vehicles, timeslots)
+
+
+class ScheduleBatchTest(unittest.TestCase):
+    START = datetime(2021, 5, 25, hour=15)
+    FORECAST = Forecast(START.date(), START, np.full(16, 100.0), np.zeros(16), np.zeros(16))
+
+    def create_jobs(self):
+        """Creates three bookings for the same station: two one after the other, which fit together, and one with an
+        unknown car model.
+        """
+        return [SchedulingJob(1, 50, self.START, self.START + timedelta(minutes=15), 60, 1, "Car", 100, None),
+                SchedulingJob(2, 50, self.START + timedelta(minutes=45), self.START + timedelta(minutes=60), 60, 1,
+                              "Car", 100, None),
+                SchedulingJob(3, 50, self.START, self.START + timedelta(minutes=60), 60, 1, "Unknown", None, None)]
+
+    def test_batch_is_written_in_one_transaction(self):
+        """Bookings scheduled together are written with a single save, and bookings without a battery capacity fail."""
+        database = FakeDatabase()
+        bookings = BookingIndex(database)
+        leftovers = schedule_batch(database, bookings, self.FORECAST, self.create_jobs(), InProcessSolver())
+
+        self.assertEqual([], leftovers)
+        self.assertEqual([3], database.failed)
+        self.assertEqual(1, len(database.saved))
+        results, changes = database.saved[0]
+        self.assertEqual([1, 2], [result.ev_id for result in results])
+        self.assertEqual({1, 2}, {entry.ev_id for entry in changes["inserted"]})
+        self.assertEqual(2, len(bookings.station(1)))
+        self.assertEqual(1, database.station_loads)
+
+    def test_clashing_bookings_are_left_over(self):
+        """A booking that clashes with a stored booking is not written and is returned to be scheduled alone."""
+        database = FakeDatabase([(9, self.START + timedelta(minutes=45), self.START + timedelta(minutes=75))])
+        leftovers = schedule_batch(database, BookingIndex(database), self.FORECAST, self.create_jobs(),
+                                   InProcessSolver())
+
+        self.assertEqual([2], [job.ev_id for job in leftovers])
+        results, changes = database.saved[0]
+        self.assertEqual([1], [result.ev_id for result in results])
+        self.assertEqual({1}, {entry.ev_id for entry in changes["inserted"]})
+
+    def test_fleet_is_scheduled_across_stations(self):
+        """Vehicles of a fleet booking at different stations are scheduled in one solve, with every station locked,
+        and only vehicles at the same station clash with each other.
+        """
+        database = FakeDatabase()
+        end = self.START + timedelta(minutes=30)
+        jobs = [SchedulingJob(1, 50, self.START, end, 60, 2, "Car", 100, 7),
+                SchedulingJob(2, 50, self.START, end, 60, 1, "Car", 100, 7)]
+        leftovers = schedule_batch(database, BookingIndex(database), self.FORECAST, jobs, InProcessSolver())
+
+        self.assertEqual([], leftovers)
+        self.assertEqual([1, 2], database.locked)
+        results, changes = database.saved[0]
+        self.assertEqual({(1, 2), (2, 1)}, {(result.ev_id, result.station) for result in results})
+
+    def test_batch_window_matches_single_booking(self):
+        """A batch is given the same time slots as its bookings would be given when scheduled one at a time."""
+        database = FakeDatabase()
+        jobs = self.create_jobs()[:2]
+        schedule_batch(database, BookingIndex(database), self.FORECAST, jobs, InProcessSolver())
+
+        scheduler = LPScheduler(["producers"], ["consumers"], ["renewable producers"], [50, 50])
+        self.assertEqual([count_timeslots(scheduler, self.START, jobs[1].preferred_end + timedelta(minutes=15))],
+                         database.windows)
+
+    def test_timed_out_batch_is_left_over(self):
+        """When the batch solve times out, every booking is returned to be scheduled one at a time."""
+        database = FakeDatabase()
+        leftovers = schedule_batch(database, BookingIndex(database), self.FORECAST, self.create_jobs(),
+                                   InProcessSolver(times_out=True))
+
+        self.assertEqual([1, 2], [job.ev_id for job in leftovers])
+        self.assertEqual([], database.saved)
+
+    def test_failed_batch_is_left_over(self):
+        """When the batch solve fails, every booking is returned to be scheduled one at a time."""
+        database = FakeDatabase()
+        leftovers = schedule_batch(database, BookingIndex(database), self.FORECAST, self.create_jobs(),
+                                   InProcessSolver(fails=True))
+
+        self.assertEqual([1, 2], [job.ev_id for job in leftovers])
+        self.assertEqual([], database.saved)
+
+
+class ScheduleJobTest(unittest.TestCase):
+    START = ScheduleBatchTest.START
+    FORECAST = ScheduleBatchTest.FORECAST
+
+    def test_failed_solve_is_retried_then_failed(self):
+        """A booking whose solve fails is deferred, and failed once it has used up its attempts, without raising."""
+        database = FakeDatabase()
+        job = SchedulingJob(1, 50, self.START, self.START + timedelta(minutes=15), 60, 1, "Car", 100, None)
+        solveAttempts = dict()
+
+        for _ in range(MAX_SOLVE_ATTEMPTS):
+            schedule_job(database, BookingIndex(database), self.FORECAST, job, InProcessSolver(fails=True),
+                         solveAttempts)
+
+        self.assertEqual([1] * (MAX_SOLVE_ATTEMPTS - 1), database.deferred)
+        self.assertEqual([1], database.failed)
+        self.assertEqual({}, solveAttempts)
+
+    def test_bookings_are_deferred_after_lost_connection(self):
+        """Bookings whose results could not be written are retried later, on a new connection if it was lost."""
+        database = FakeDatabase()
+        jobs = [SchedulingJob(ev_id, 50, self.START, self.START + timedelta(minutes=15), 60, 1, "Car", 100, None)
+                for ev_id in (1, 2, 3)]
+
+        recover(database, jobs[:2], errors.OperationalError("Lost connection to MySQL server during query"))
+        recover(database, jobs[2:], TimeoutError("Could not lock charging station 1"))
+
+        self.assertEqual([1, 2, 3], database.deferred)
+        self.assertEqual(1, database.reconnects)
+
+
+class RunWorkerTest(unittest.TestCase):
+    START = ScheduleBatchTest.START
+
+    def create_job(self, ev_id, fleet_job=None):
+        return SchedulingJob(ev_id, 50, self.START, self.START + timedelta(minutes=15), 60, 1, "Car", 100, fleet_job)
+
+    def test_fleet_is_claimed_together(self):
+        """Claiming a vehicle of a fleet booking also claims the rest of the fleet, and no other booking."""
+        database = FakeDatabase(claimable=[self.create_job(2, 7), self.create_job(3, 7), self.create_job(4)])
+        jobs = claim_jobs(database, FakeQueue([self.create_job(1, 7)]), 1, 0)
+
+        self.assertEqual([1, 2, 3], [job.ev_id for job in jobs])
+        self.assertEqual([(MAX_FLEET_SIZE, 7, [1])], database.claims)
+
+    def test_single_booking_is_claimed_alone(self):
+        """A booking that is not part of a fleet booking is claimed on its own."""
+        database = FakeDatabase(claimable=[self.create_job(2, 7)])
+        jobs = claim_jobs(database, FakeQueue([self.create_job(1)]), 1, 0)
+
+        self.assertEqual([1], [job.ev_id for job in jobs])
+        self.assertEqual([], database.claims)
+
+    def test_leftovers_with_lapsed_leases_are_dropped(self):
+        """Each leftover booking has its lease renewed before it is scheduled, and leftovers that are no longer
+        leased to the worker are skipped.
+        """
+        database = FakeDatabase(lapsed={2, 3})
+        pending = [self.create_job(ev_id, 7) for ev_id in (1, 2, 3, 4)]
+
+        self.assertEqual(1, next_pending_job(database, pending).ev_id)
+        self.assertEqual(4, next_pending_job(database, pending).ev_id)
+        self.assertIsNone(next_pending_job(database, pending))
+        self.assertEqual([1, 2, 3, 4], database.renewed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+
+import numpy as np
+
+from scheduler.forecast_cache import Forecast
+from scheduler.lp_scheduler import TimetableEntry
+from scheduler.scheduler_db import SchedulerDatabase, SchedulingJob, charger_from_db, charger_to_db
+from datetime import datetime, timedelta
+
+
+class FakeCursor:
+    """Cursor that records the queries it is given and returns preset rows."""
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def executemany(self, query, seq_params):
+        self.queries.append((query, list(seq_params)))
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.fake_cursor = FakeCursor(rows)
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.fake_cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class SchedulerDatabaseTest(unittest.TestCase):
+    START = datetime(2021, 5, 25, hour=15)
+    END = datetime(2021, 5, 25, hour=16)
+
+    def test_fetch_next_job_claims_job(self):
+        """The next job and the battery capacity of its vehicle are loaded in a single query, skipping jobs locked by
+        other workers, and the job is leased to the worker.
+        """
+        connection = FakeConnection([(4, 20, self.START, self.END, 80, 2, "Nissan Leaf", 40, None)])
+        job = SchedulerDatabase(connection, worker_id="worker-1").fetch_next_job()
+
+        self.assertEqual(SchedulingJob(4, 20, self.START, self.END, 80, 2, "Nissan Leaf", 40, None), job)
+        self.assertEqual(0, job.charger_id)
+
+        (select, select_params), (update, update_params) = connection.fake_cursor.queries
+        self.assertIn("SKIP LOCKED", select)
+        self.assertEqual(("worker-1", 1), select_params)
+        self.assertTrue(update.startswith("UPDATE userdata SET Lease_Owner"))
+        self.assertEqual(("worker-1", 300, 4), update_params)
+
+    def test_fetch_next_job_without_jobs(self):
+        """None is returned when no booking is waiting to be scheduled."""
+        self.assertIsNone(SchedulerDatabase(FakeConnection([])).fetch_next_job())
+
+    def test_fetch_next_job_with_unknown_car(self):
+        """A car model missing from cardata gives a job without a battery capacity."""
+        connection = FakeConnection([(4, 20, self.START, self.END, 80, 1, "Unknown", None, None)])
+
+        self.assertIsNone(SchedulerDatabase(connection).fetch_next_job().battery_capacity)
+
+    def test_renew_lease_extends_own_lease(self):
+        """A booking still leased to the worker has its lease extended."""
+        connection = FakeConnection([(4,)])
+
+        self.assertTrue(SchedulerDatabase(connection, worker_id="worker-1").renew_lease(4))
+        (select, select_params), (update, update_params) = connection.fake_cursor.queries
+        self.assertEqual((4, "worker-1"), select_params)
+        self.assertTrue(update.startswith("UPDATE userdata SET Lease_Expires"))
+        self.assertEqual((300, 4), update_params)
+
+    def test_renew_lease_of_lost_booking(self):
+        """A booking no longer leased to the worker is not renewed."""
+        connection = FakeConnection([])
+
+        self.assertFalse(SchedulerDatabase(connection, worker_id="worker-1").renew_lease(4))
+        self.assertEqual(1, len(connection.fake_cursor.queries))
+
+    def test_fetch_existing_schedules_groups_rows_by_timeslot(self):
+        """Existing bookings over the whole window come from one query and are grouped into their time slots, with
+        the charger IDs used by the LP Scheduler.
+        """
+        slot = [self.START + timedelta(minutes=15 * ts_i) for ts_i in range(4)]
+        connection = FakeConnection([(slot[2], 9, 3, 1, self.START, self.END),
+                                     (slot[0], 7, 5, 2, self.START, self.END),
+                                     (slot[2], 7, 4, 2, self.START, self.END),
+                                     (slot[0] + timedelta(minutes=5), 8, 1, 1, self.START, self.END)])
+        schedules = SchedulerDatabase(connection).fetch_existing_schedules(self.START, 4, 4)
+
+        self.assertEqual(1, len(connection.fake_cursor.queries))
+        self.assertEqual((self.START, slot[3], 4), connection.fake_cursor.queries[0][1])
+        self.assertEqual([[(7, 5, 0)], None, [(9, 3, 1), (7, 4, 0)], None],
+                         [None if ts is None else [(s.ev_id, s.charge, s.charger_id) for s in ts]
+                          for ts in schedules])
+        self.assertEqual([None] * 3, SchedulerDatabase(FakeConnection([])).fetch_existing_schedules(self.START, 3, 4))
+
+    def test_save_schedule_commits_once(self):
+        """A schedule is written with one statement per kind of change and committed in a single transaction."""
+        connection = FakeConnection([])
+        entries = [TimetableEntry(4, self.START + timedelta(minutes=15 * ts_i), 5.0, 0, self.START, self.END)
+                   for ts_i in range(3)]
+        SchedulerDatabase(connection).save_schedule(4, {"inserted": entries, "updated": [], "removed": entries[:1]},
+                                                    self.START, self.END, 2, 80)
+
+        queries = connection.fake_cursor.queries
+        self.assertEqual(["DELETE", "DELETE", "INSERT", "UPDATE", "INSERT"],
+                         [query.split()[0] for query, params in queries])
+        self.assertEqual(3, len(queries[2][1]))
+        self.assertEqual(1, queries[2][1][0][5])
+        self.assertIn("stationversions", queries[4][0])
+        self.assertEqual([(2,)], queries[4][1])
+        self.assertEqual(1, connection.commits)
+
+    def test_save_schedule_rolls_back_on_error(self):
+        """Nothing is committed when one of the statements fails."""
+        connection = FakeConnection([])
+
+        def fail(query, params):
+            raise RuntimeError("Lost connection")
+        connection.fake_cursor.executemany = fail
+
+        entry = TimetableEntry(4, self.START, 5.0, 0, self.START, self.END)
+        with self.assertRaises(RuntimeError):
+            SchedulerDatabase(connection).save_schedule(4, {"inserted": [entry], "updated": [], "removed": []},
+                                                        self.START, self.END, 2, 80)
+        self.assertEqual((0, 1), (connection.commits, connection.rollbacks))
+
+    def test_station_lock_raises_on_timeout(self):
+        """A station lock that cannot be acquired raises a TimeoutError instead of running the commit phase."""
+        database = SchedulerDatabase(FakeConnection([(0,)]))
+
+        with self.assertRaises(TimeoutError):
+            with database.station_lock(1):
+                self.fail("The commit phase ran without the station lock")
+
+    def test_save_forecast_stores_every_slot(self):
+        """The forecast of each time slot of the day is stored in one statement and the forecast version moves on."""
+        connection = FakeConnection([])
+        forecast = Forecast(self.START.date(), self.START, np.full(4, 10.0), np.full(4, 2.0), np.arange(4.0))
+        SchedulerDatabase(connection).save_forecast(forecast, 1000)
+
+        (insert, rows), (bump, bump_params) = connection.fake_cursor.queries
+        self.assertEqual(4, len(rows))
+        self.assertEqual((datetime(2021, 5, 25, 0, 45), 10.0, 2.0, 3.0, 1000), rows[3])
+        self.assertEqual(("forecast",), bump_params)
+        self.assertEqual(1, connection.commits)
+
+    def test_charger_conversions(self):
+        """Charger IDs written back to the database use the same mapping as before."""
+        self.assertEqual(0, charger_from_db(2))
+        self.assertEqual(1, charger_from_db(1))
+        self.assertEqual([1, 0], [charger_to_db(0), charger_to_db(1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+"""Benchmark for the scheduling queries against a large Scheduler database, with and without the indexes added by the
+Django migration 0003_scheduling_indexes.
+
+Creates a scratch database on a local MySQL server, seeds it with NUM_BOOKINGS bookings and their time slots, and
+times the queries the scheduler worker and the web application run most before and after creating the indexes.
+
+Run from the simulation directory with: PYTHONPATH=. python test/scheduling_queries_benchmark.py [--host ...]
+The scratch database given by --database is dropped and created again.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import mysql.connector
+
+from scheduler.scheduler_db import SchedulerDatabase
+from datetime import datetime, timedelta
+
+NUM_BOOKINGS = 1000000
+NUM_STATIONS = 50
+SLOTS_PER_BOOKING = 4
+SCHEDULING_SHARE = 0.001
+BATCH_SIZE = 10000
+REPEATS = 20
+START = datetime(2021, 1, 1)
+DAYS = 365
+
+TABLES = [
+    "CREATE TABLE cardata (id INT AUTO_INCREMENT PRIMARY KEY, Car_Model VARCHAR(100) NOT NULL UNIQUE, "
+    "Battery_Capacity INT NOT NULL)",
+    "CREATE TABLE userdata (id INT AUTO_INCREMENT PRIMARY KEY, Username VARCHAR(45) NOT NULL, "
+    "Car VARCHAR(100) NOT NULL, Current_Charge INT NOT NULL, Preferred_Charge_Station INT NOT NULL, "
+    "Preferred_Start_Datetime DATETIME NOT NULL, Preferred_End_Datetime DATETIME NOT NULL, "
+    "Preferred_Charge_Level INT NOT NULL, Scheduled_Datetime_Start DATETIME NOT NULL, "
+    "Scheduled_Datetime_End DATETIME NOT NULL, Charging_Station INT NOT NULL, Final_Charge INT NOT NULL, "
+    "Is_Scheduling TINYINT(1) NOT NULL, Arrival DATETIME NOT NULL, Slot_Taken TINYINT(1) NOT NULL, "
+    "New_Sugg_Start DATETIME NOT NULL, New_Sugg_End DATETIME NOT NULL, Error INT NOT NULL, "
+    "Lease_Owner VARCHAR(64) NULL, Lease_Expires DATETIME NULL, Fleet_Job INT NULL)",
+    "CREATE TABLE userTimes (id INT AUTO_INCREMENT PRIMARY KEY, idEV INT NOT NULL, chargeInSlot DOUBLE NOT NULL, "
+    "Timeslots DATETIME NOT NULL, ArrivalTime DATETIME NOT NULL, EndTime DATETIME NOT NULL, chargerID INT NOT NULL)",
+]
+
+# The same indexes as djangoProject/migrations/0003_scheduling_indexes.py
+INDEXES = [
+    "CREATE INDEX userdata_username_idx ON userdata (Username)",
+    "CREATE INDEX userdata_scheduling_idx ON userdata (Is_Scheduling, Arrival)",
+    "CREATE INDEX userdata_station_period_idx ON userdata "
+    "(Charging_Station, Scheduled_Datetime_Start, Scheduled_Datetime_End)",
+    "CREATE INDEX usertimes_slot_ev_idx ON userTimes (Timeslots, idEV)",
+    "CREATE INDEX usertimes_ev_slot_idx ON userTimes (idEV, Timeslots)",
+]
+
+
+def create_database(args):
+    db = mysql.connector.connect(host=args.host, user=args.user, passwd=args.password)
+    cursor = db.cursor()
+    cursor.execute("DROP DATABASE IF EXISTS `{}`".format(args.database))
+    cursor.execute("CREATE DATABASE `{}`".format(args.database))
+    db.close()
+
+    db = mysql.connector.connect(host=args.host, user=args.user, passwd=args.password, database=args.database)
+    cursor = db.cursor()
+    for table in TABLES:
+        cursor.execute(table)
+    cursor.execute("INSERT INTO cardata (Car_Model, Battery_Capacity) VALUES ('Nissan Leaf', 40)")
+    db.commit()
+    return db
+
+
+def seed(db):
+    """Inserts NUM_BOOKINGS bookings one after the other at each station, spread over DAYS days, each with
+    SLOTS_PER_BOOKING time slots. A SCHEDULING_SHARE of the bookings are waiting to be scheduled.
+    """
+    cursor = db.cursor()
+    bookings_per_station = NUM_BOOKINGS // NUM_STATIONS
+    spacing = timedelta(days=DAYS) / bookings_per_station
+    length = timedelta(minutes=15 * SLOTS_PER_BOOKING)
+
+    for first in range(0, NUM_BOOKINGS, BATCH_SIZE):
+        bookings, slots = [], []
+        for ev_id in range(first + 1, min(first + BATCH_SIZE, NUM_BOOKINGS) + 1):
+            station = ev_id % NUM_STATIONS + 1
+            start = START + spacing * (ev_id // NUM_STATIONS)
+            start -= timedelta(minutes=start.minute % 15, seconds=start.second, microseconds=start.microsecond)
+            end = start + length
+            scheduling = random.random() < SCHEDULING_SHARE
+            bookings.append(("user{}".format(ev_id), "Nissan Leaf", 20, station, start, end, 80, start, end, station,
+                             80, scheduling, start - timedelta(days=1), 0, start, end, 0))
+            slots.extend((ev_id, 5.0, start + timedelta(minutes=15 * i), start, end, station)
+                         for i in range(SLOTS_PER_BOOKING))
+
+        cursor.executemany("INSERT INTO userdata (Username, Car, Current_Charge, Preferred_Charge_Station, "
+                           "Preferred_Start_Datetime, Preferred_End_Datetime, Preferred_Charge_Level, "
+                           "Scheduled_Datetime_Start, Scheduled_Datetime_End, Charging_Station, Final_Charge, "
+                           "Is_Scheduling, Arrival, Slot_Taken, New_Sugg_Start, New_Sugg_End, Error) "
+                           "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", bookings)
+        cursor.executemany("INSERT INTO userTimes (idEV, chargeInSlot, Timeslots, ArrivalTime, EndTime, chargerID) "
+                           "VALUES (%s, %s, %s, %s, %s, %s)", slots)
+        db.commit()
+
+
+def random_time():
+    return START + timedelta(minutes=15 * random.randrange(DAYS * 96))
+
+
+def check_clash(database, start):
+    return database.find_clash(start, start + timedelta(hours=1), random.randint(1, NUM_STATIONS), 0)
+
+
+def find_user(database, username):
+    # The lookup the web application runs on every page
+    database.cursor.execute("SELECT id FROM userdata WHERE Username = %s", (username,))
+    return database.cursor.fetchall()
+
+
+def time_queries(db):
+    """Times each query REPEATS times with random parameters.
+
+    Returns:
+        A dictionary of query names to their median latency in milliseconds.
+    """
+    database = SchedulerDatabase(db, worker_id="benchmark", lease_seconds=1)
+    queries = {
+        "claim next booking": lambda: database.fetch_jobs(1),
+        "clash check": lambda: check_clash(database, random_time()),
+        "station bookings": lambda: database.fetch_station_bookings(random.randint(1, NUM_STATIONS),
+                                                                    START + timedelta(days=DAYS - 1)),
+        "existing schedules": lambda: database.fetch_existing_schedules(random_time(), 24, 0),
+        "user lookup": lambda: find_user(database, "user{}".format(random.randint(1, NUM_BOOKINGS))),
+    }
+
+    latencies = dict()
+    for name, query in queries.items():
+        times = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            query()
+            times.append((time.perf_counter() - start) * 1000)
+        latencies[name] = statistics.median(times)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling queries with and without indexes.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="scheduler_benchmark")
+    args = parser.parse_args()
+
+    db = create_database(args)
+    print("Seeding {} bookings...".format(NUM_BOOKINGS))
+    seed(db)
+
+    before = time_queries(db)
+    cursor = db.cursor()
+    for index in INDEXES:
+        cursor.execute(index)
+    cursor.execute("ANALYZE TABLE userdata, userTimes")
+    cursor.fetchall()
+    after = time_queries(db)
+
+    print("{:<20} {:>12} {:>12} {:>9}".format("query", "before (ms)", "after (ms)", "speedup"))
+    for name in before:
+        print("{:<20} {:>12.2f} {:>12.2f} {:>8.1f}x".format(name, before[name], after[name],
+                                                            before[name] / after[name]))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
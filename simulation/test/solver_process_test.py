@@ -0,0 +1,41 @@
+import unittest
+
+from scheduler.lp_scheduler import TimeSlotInfo, VehicleInfo, LPScheduler
+from scheduler.solver_process import SolverProcess, SolveTimeout
+from datetime import datetime, timedelta
+
+
+class SolverProcessTest(unittest.TestCase):
+    START = datetime(2021, 5, 25, hour=15)
+    SCHEDULER_ARGS = (["Coal"], ["All Consumption"], ["Solar"], [50, 50])
+
+    def setUp(self):
+        self.solver = SolverProcess(timeout=60)
+        self.vehicles = [VehicleInfo(1, (self.START, self.START + timedelta(minutes=30)), 50, 60, 100, 0)]
+        self.timeslots = [TimeSlotInfo(self.START + timedelta(minutes=15 * ts_i), 20, 0, 0, float("inf"), [0])
+                          for ts_i in range(3)]
+
+    def tearDown(self):
+        self.solver.close()
+
+    def test_solve_matches_in_process_solve(self):
+        """A solve in the subprocess gives the same timetable as solving in the worker."""
+        expected = LPScheduler(*self.SCHEDULER_ARGS).schedule(self.vehicles, self.timeslots)
+        timetable = self.solver.solve(self.SCHEDULER_ARGS, self.vehicles, self.timeslots)
+
+        self.assertEqual(expected.timetable, timetable.timetable)
+        self.assertEqual(expected.get_schedule_status(), timetable.get_schedule_status())
+
+    def test_timed_out_solve_is_killed(self):
+        """A solve over the time limit raises SolveTimeout, and the next solve runs in a fresh subprocess."""
+        self.solver.timeout = 0
+        with self.assertRaises(SolveTimeout):
+            self.solver.solve(self.SCHEDULER_ARGS, self.vehicles, self.timeslots)
+
+        self.solver.timeout = 60
+        timetable = self.solver.solve(self.SCHEDULER_ARGS, self.vehicles, self.timeslots)
+        self.assertEqual(10, timetable.get_schedules()[1]["charge"])
+
+
+if __name__ == "__main__":
+    unittest.main()
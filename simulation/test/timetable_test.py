@@ -0,0 +1,152 @@
+import json
+import unittest
+
+import numpy as np
+
+from scheduler.lp_scheduler import ScheduleInfo, TimeSlotInfo, VehicleInfo, LPScheduler, Timetable
+from datetime import datetime, timedelta
+
+
+class TimetableTest(unittest.TestCase):
+    START = datetime(2021, 5, 25, hour=15)
+
+    @classmethod
+    def create_schedule_lists(cls):
+        """Creates a list of lists timetable with two vehicles on different chargers over three time slots.
+
+        Returns:
+            A list of lists of ScheduleInfo objects where the index of the outer list is the time slot.
+        """
+        arrival = cls.START
+        departure = cls.START + timedelta(minutes=30)
+        return [[ScheduleInfo(7, 5.0, 0, arrival, departure), ScheduleInfo(9, 2.0, 1, arrival, departure)],
+                [ScheduleInfo(9, 3.0, 1, arrival, departure)],
+                []]
+
+    def test_schedule_lists_round_trip(self):
+        """A timetable created from the list of lists representation gives the same representation back."""
+        schedule_lists = self.create_schedule_lists()
+        timetable = Timetable.from_schedule_lists(schedule_lists, self.START)
+
+        self.assertEqual(3, timetable.num_timeslots)
+        self.assertEqual(3, len(timetable.charges))
+        self.assertEqual(schedule_lists, timetable.timetable)
+
+    def test_get_schedules_summarises_each_vehicle(self):
+        """get_schedules sums the charge of each vehicle and keeps its arrival and departure."""
+        timetable = Timetable.from_schedule_lists(self.create_schedule_lists(), self.START)
+
+        self.assertEqual({7: {"arrival": self.START, "departure": self.START + timedelta(minutes=30), "charge": 5.0},
+                          9: {"arrival": self.START, "departure": self.START + timedelta(minutes=30), "charge": 5.0}},
+                         timetable.get_schedules())
+        self.assertEqual([7, 9], list(timetable.get_schedules().keys()))
+
+    def test_charger_views_only_contain_charger_vehicles(self):
+        """get_charger_schedules splits the timetable into one timetable per charger."""
+        timetable = Timetable.from_schedule_lists(self.create_schedule_lists(), self.START)
+        charger_schedules = timetable.get_charger_schedules()
+
+        self.assertEqual([0, 1], sorted(charger_schedules.keys()))
+        self.assertEqual([[7], [], []], [[s.ev_id for s in ts] for ts in charger_schedules[0]])
+        self.assertEqual([[9], [9], []], [[s.ev_id for s in ts] for ts in charger_schedules[1]])
+
+    def test_charge_matrix_is_dense_view(self):
+        """get_charge_matrix expands the sparse charges into a (time slots x vehicles) matrix."""
+        timetable = Timetable.from_schedule_lists(self.create_schedule_lists(), self.START)
+
+        self.assertTrue(np.array_equal([[5.0, 2.0], [0.0, 3.0], [0.0, 0.0]], timetable.get_charge_matrix()))
+
+    def test_diff_reports_inserted_updated_and_removed_entries(self):
+        """diff matches entries on vehicle and time slot datetime and only reports the entries that changed."""
+        previous = Timetable.from_schedule_lists(self.create_schedule_lists(), self.START)
+        schedule_lists = self.create_schedule_lists()
+        schedule_lists[0][1].charge = 4.0  # Vehicle 9 gets more charge in the first time slot
+        del schedule_lists[1][0]  # Vehicle 9 no longer charges in the second time slot
+        schedule_lists[2].append(ScheduleInfo(11, 1.0, 0, self.START, self.START + timedelta(minutes=45)))
+        current = Timetable.from_schedule_lists(schedule_lists, self.START)
+
+        changes = current.diff(previous)
+
+        self.assertEqual([(11, self.START + timedelta(minutes=30), 1.0)],
+                         [entry[:3] for entry in changes["inserted"]])
+        self.assertEqual([(9, self.START, 4.0)], [entry[:3] for entry in changes["updated"]])
+        self.assertEqual([(9, self.START + timedelta(minutes=15), 3.0)],
+                         [entry[:3] for entry in changes["removed"]])
+
+    def test_diff_matches_time_slots_across_different_starts(self):
+        """Timetables starting at different times are compared on the absolute datetime of each time slot."""
+        schedule_lists = self.create_schedule_lists()
+        previous = Timetable.from_schedule_lists(schedule_lists, self.START)
+        current = Timetable.from_schedule_lists([[]] + schedule_lists[:2], self.START - timedelta(minutes=15))
+
+        self.assertEqual({"inserted": [], "updated": [], "removed": []}, current.diff(previous))
+        self.assertEqual(3, len(current.diff(None)["inserted"]))
+
+    def test_bytes_round_trip(self):
+        """A timetable loaded from its binary format has the same contents as the original."""
+        timetable = Timetable.from_schedule_lists(self.create_schedule_lists(), self.START, {0: 0, 1: 2})
+        loaded = Timetable.from_bytes(timetable.to_bytes())
+
+        self.assertEqual(timetable.timetable, loaded.timetable)
+        self.assertEqual(timetable.get_schedules(), loaded.get_schedules())
+        self.assertEqual({0: 0, 1: 2}, loaded.get_schedule_status())
+        self.assertEqual(self.START, loaded.timetable_start)
+        self.assertEqual(15, loaded.interval_length)
+
+    def test_from_bytes_rejects_unknown_formats(self):
+        """Loading a buffer that is not a timetable, or has a different format version, raises a ValueError."""
+        buffer = bytearray(Timetable.from_schedule_lists(self.create_schedule_lists(), self.START).to_bytes())
+
+        with self.assertRaises(ValueError):
+            Timetable.from_bytes(b"not a timetable")
+        buffer[4] += 1
+        with self.assertRaises(ValueError):
+            Timetable.from_bytes(bytes(buffer))
+
+    def test_json_encodes_each_time_slot(self):
+        """The streamed JSON document decodes to one list of schedules per time slot."""
+        timetable = Timetable.from_schedule_lists(self.create_schedule_lists(), self.START, {0: 0})
+        chunks = list(timetable.iter_json())
+        document = json.loads("".join(chunks))
+
+        self.assertEqual(timetable.num_timeslots + 2, len(chunks))
+        self.assertEqual("2021-05-25T15:00:00", document["timetable_start"])
+        self.assertEqual({"0": 0}, document["schedule_status"])
+        self.assertEqual([[7, 9], [9], []], [[s["ev_id"] for s in ts] for ts in document["timetable"]])
+        self.assertEqual({"ev_id": 9, "charge": 3.0, "charger_id": 1,
+                          "arrival": "2021-05-25T15:00:00", "departure": "2021-05-25T15:30:00"},
+                         document["timetable"][1][0])
+
+    def test_schedule_keeps_existing_schedules(self):
+        """Scheduling around an existing schedule includes the existing vehicle in the returned timetable for every
+        time slot allocated to it, after the newly scheduled vehicle.
+        """
+        existing = ScheduleInfo(5, 2, 1, self.START, self.START + timedelta(minutes=30))
+        timeslots = [TimeSlotInfo(self.START + timedelta(minutes=15 * ts_i),
+                                  traditional_prod=20,
+                                  consumption=0,
+                                  renewables_prod=0,
+                                  max_capacity=float("inf"),
+                                  available_chargers=[0] if ts_i < 2 else [],
+                                  existing_schedules=[existing] if ts_i < 2 else None)
+                     for ts_i in range(3)]
+        vehicle = VehicleInfo(ev_id=1,
+                              time_period=(self.START, self.START + timedelta(minutes=30)),
+                              arrival_soc=50,
+                              soc_demand=60,
+                              battery_capacity=100,
+                              charger_id=0)
+
+        scheduler = LPScheduler(["Coal"], ["All Consumption"], ["Solar"], [50, 50])
+        schedule = scheduler.schedule([vehicle], timeslots)
+
+        self.assertEqual([1, 5], [s.ev_id for s in schedule.timetable[0]])
+        self.assertEqual(5, schedule.timetable[1][-1].ev_id)
+        self.assertEqual([], schedule.timetable[2])
+        self.assertEqual(10, schedule.get_schedules()[1]["charge"])
+        self.assertEqual(4, schedule.get_schedules()[5]["charge"])
+        self.assertEqual({0: Timetable.SCHEDULED_SUCCESSFULLY}, schedule.get_schedule_status())
+
+
+if __name__ == "__main__":
+    unittest.main()